@@ -0,0 +1,102 @@
+"""Доля попаданий в кэш страниц при нескольких воркерах.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.cache_workers --workers 4 --profiles locmem,sqlite
+
+Каждый воркер - отдельный процесс, как у gunicorn. Воркеры запрашивают
+страницы с распределением Zipf и при промахе "рендерят" страницу и кладут
+её в кэш профиля из settings.CACHE_PROFILES.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.utils import setup_django
+
+LOCAL_LOCATIONS = {'file': 'cache', 'sqlite': 'cache.sqlite3'}
+
+
+def build_cache(profile, directory):
+    from django.conf import settings
+    from django.utils.module_loading import import_string
+
+    params = dict(settings.CACHE_PROFILES[profile])
+    backend = import_string(params.pop('BACKEND'))
+    location = params.pop('LOCATION', '')
+    if profile in LOCAL_LOCATIONS:
+        location = os.path.join(directory, LOCAL_LOCATIONS[profile])
+    return backend(location, params)
+
+
+def render(size, cost):
+    deadline = time.perf_counter() + cost / 1000
+    while time.perf_counter() < deadline:
+        pass
+    return os.urandom(size)
+
+
+def worker(profile, directory, options, seed, results):
+    cache = build_cache(profile, directory)
+    rnd = random.Random(seed)
+    hits = 0
+    for _ in range(options.requests):
+        page = min(int(rnd.paretovariate(options.skew)), options.pages)
+        key = f'bench:page:{page}'
+        if cache.get(key) is not None:
+            hits += 1
+        else:
+            cache.set(key, render(options.page_size, options.render_ms))
+    results.put(hits)
+
+
+def run(profile, options):
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+    try:
+        build_cache(profile, directory).clear()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=worker,
+                args=(profile, directory, options, seed, results),
+            )
+            for seed in range(options.workers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        hits = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    total = options.requests * options.workers
+    return hits / total, total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', default='locmem,file,sqlite')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--skew', type=float, default=0.5)
+    parser.add_argument('--page-size', type=int, default=30000)
+    parser.add_argument('--render-ms', type=float, default=2.0)
+    options = parser.parse_args()
+
+    setup_django(':memory:')
+    print(f'{"профиль":<10} {"попадания":>10} {"запросов/с":>12}')
+    for profile in options.profiles.split(','):
+        hit_ratio, throughput = run(profile, options)
+        print(f'{profile:<10} {hit_ratio:>10.1%} {throughput:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
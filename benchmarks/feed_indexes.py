@@ -0,0 +1,179 @@
+"""Планы запросов лент до и после индексов из posts.0010_feed_indexes.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.feed_indexes --posts 1000000
+
+Данные загружаются во временную базу SQLite (или в --database), затем
+для каждого запроса ленты печатаются время и EXPLAIN без индексов и с ними.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.utils import insert_rows, setup_django, timed
+
+BEFORE = '0009_auto_20221203_0522'
+AFTER = '0010_feed_indexes'
+
+
+def load(options):
+    from django.contrib.auth import get_user_model
+    from django.db import connection, transaction
+    from posts.models import Follow, Group
+
+    User = get_user_model()
+    rnd = random.Random(options.seed)
+    start = datetime(2020, 1, 1)
+    adapt = connection.ops.adapt_datetimefield_value
+
+    # Схема откатана до BEFORE, а модели описывают последнюю миграцию,
+    # поэтому строки вставляются явными колонками, без ORM.
+    with transaction.atomic(), connection.cursor() as cursor:
+        insert_rows(
+            cursor,
+            User._meta.db_table,
+            (
+                'username', 'password', 'first_name', 'last_name', 'email',
+                'is_superuser', 'is_staff', 'is_active', 'date_joined',
+            ),
+            (
+                (f'user{number}', '!', '', '', '', False, False, True,
+                 adapt(start))
+                for number in range(options.users)
+            ),
+        )
+        insert_rows(
+            cursor,
+            'posts_group',
+            ('title', 'slug', 'description'),
+            (
+                (f'Группа {number}', f'group-{number}', '')
+                for number in range(options.groups)
+            ),
+        )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True)) + [None]
+    posts = (
+        (
+            f'Пост {number}',
+            adapt(start + timedelta(seconds=number)),
+            rnd.choice(user_ids),
+            rnd.choice(group_ids),
+            '',
+        )
+        for number in range(options.posts)
+    )
+    comments = (
+        (
+            f'Комментарий {number}',
+            adapt(start + timedelta(seconds=number)),
+            rnd.randint(1, options.posts),
+            rnd.choice(user_ids),
+        )
+        for number in range(options.comments)
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        insert_rows(
+            cursor,
+            'posts_post',
+            ('text', 'pub_date', 'author_id', 'group_id', 'image'),
+            posts,
+        )
+        insert_rows(
+            cursor,
+            'posts_comment',
+            ('text', 'pub_date', 'post_id', 'author_id'),
+            comments,
+        )
+    Follow.objects.bulk_create(
+        Follow(user_id=user_ids[0], author_id=author_id)
+        for author_id in rnd.sample(user_ids[1:], options.follows)
+    )
+    analyze()
+
+
+def analyze():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def feed_queries(deep_page):
+    from posts.models import Comment, Follow, Post
+    from posts.utils import POST_PER_PAGE
+
+    post = Post.objects.order_by('?').only('pk', 'author', 'group').filter(
+        group__isnull=False
+    ).first()
+    follower_id = Follow.objects.values_list('user_id', flat=True).first()
+    author_ids = list(
+        Follow.objects.filter(user_id=follower_id).values_list(
+            'author_id', flat=True
+        )
+    )
+    offset = (deep_page - 1) * POST_PER_PAGE
+    feeds = {
+        'index': Post.objects.for_feed(),
+        'group_posts': Post.objects.for_feed().filter(group_id=post.group_id),
+        'profile': Post.objects.for_feed().filter(author_id=post.author_id),
+        'follow_index': Post.objects.for_feed().filter(
+            author_id__in=author_ids
+        ),
+    }
+    queries = {}
+    for name, queryset in feeds.items():
+        queries[name] = queryset[:POST_PER_PAGE]
+        queries[f'{name} page {deep_page}'] = queryset[
+            offset:offset + POST_PER_PAGE
+        ]
+    queries['post_detail comments'] = Comment.objects.filter(
+        post_id=post.pk
+    ).select_related('author').order_by('pub_date')
+    return queries
+
+
+def measure(queries, repeat):
+    return {
+        name: (timed(lambda: list(queryset.all()), repeat), queryset.explain())
+        for name, queryset in queries.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--comments', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--follows', type=int, default=20)
+    parser.add_argument('--deep-page', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database')
+    options = parser.parse_args()
+
+    database = setup_django(options.database)
+    from django.core.management import call_command
+
+    print(f'База: {database}')
+    call_command('migrate', verbosity=0)
+    call_command('migrate', 'posts', BEFORE, verbosity=0)
+    load(options)
+    queries = feed_queries(options.deep_page)
+    before = measure(queries, options.repeat)
+    call_command('migrate', 'posts', AFTER, verbosity=0)
+    analyze()
+    after = measure(queries, options.repeat)
+
+    for name in queries:
+        before_ms, before_plan = before[name]
+        after_ms, after_plan = after[name]
+        print(f'\n== {name}: {before_ms:.2f} ms -> {after_ms:.2f} ms')
+        print(f'-- без индексов:\n{before_plan}')
+        print(f'-- с индексами:\n{after_plan}')
+
+
+if __name__ == '__main__':
+    main()
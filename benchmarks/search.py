@@ -0,0 +1,132 @@
+"""Поиск по постам: LIKE '%слово%' против индекса из posts.0013_post_search.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.search --posts 1000000
+
+Тексты постов собираются из случайных слов словаря; для каждого
+запроса печатаются число найденных постов, время первой страницы
+через LIKE и через полнотекстовый индекс, а также их планы.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.utils import insert_rows, setup_django, timed
+
+WORDS = (
+    'утро вечер город река лес поле дорога дом окно книга письмо друг '
+    'кот собака небо море солнце дождь снег ветер песня музыка кофе чай '
+    'работа отпуск поезд самолёт мост парк сад цветок дерево гора озеро '
+    'остров берег звезда луна облако фильм театр выставка картина'
+).split()
+RARE_WORDS = ('фотоаппарат', 'велосипед', 'маяк')
+QUERIES = ('город', 'самолёт', 'маяк', 'кофе книга', 'фото')
+
+
+def load(options):
+    from django.contrib.auth import get_user_model
+    from django.db import connection, transaction
+    from posts import search
+
+    User = get_user_model()
+    rnd = random.Random(options.seed)
+    start = datetime(2020, 1, 1)
+    adapt = connection.ops.adapt_datetimefield_value
+
+    User.objects.bulk_create(
+        User(username=f'user{number}') for number in range(options.users)
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+
+    def text():
+        words = rnd.choices(WORDS, k=rnd.randint(5, 30))
+        if rnd.random() < 0.001:
+            words.append(rnd.choice(RARE_WORDS))
+        return ' '.join(words).capitalize()
+
+    posts = (
+        (
+            text(),
+            adapt(start + timedelta(seconds=number)),
+            rnd.choice(user_ids),
+            None,
+            '',
+            0,
+        )
+        for number in range(options.posts)
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        insert_rows(
+            cursor,
+            'posts_post',
+            (
+                'text', 'pub_date', 'author_id', 'group_id', 'image',
+                'comments_count',
+            ),
+            posts,
+        )
+        search.rebuild()
+        cursor.execute('ANALYZE')
+
+
+def queries(query, per_page):
+    """Одни и те же выборки через LIKE и через индекс."""
+    from posts import search
+    from posts.models import Post
+
+    like = Post.objects.filter(text__icontains=query).order_by('-pub_date')
+    indexed = search.filter_posts(Post.objects.all(), query).order_by(
+        '-pub_date'
+    )
+    paginator = search.SearchPaginator(query, per_page)
+    return {
+        'страница по дате': (
+            lambda: list(like[:per_page]),
+            lambda: list(indexed[:per_page]),
+            indexed[:per_page].explain(),
+        ),
+        'число найденных': (like.count, indexed.count, None),
+        'страница по рангу': (None, paginator.get_page, None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database')
+    options = parser.parse_args()
+
+    database = setup_django(options.database)
+    from django.core.management import call_command
+
+    print(f'База: {database}')
+    call_command('migrate', verbosity=0)
+    load(options)
+
+    from posts.models import Post
+    from posts.utils import POST_PER_PAGE
+
+    for query in QUERIES:
+        like_found = Post.objects.filter(text__icontains=query).count()
+        print(f'\n== {query!r}: LIKE находит {like_found}')
+        for name, (like, indexed, plan) in queries(
+            query, POST_PER_PAGE
+        ).items():
+            indexed_ms = timed(indexed, options.repeat)
+            if like is None:
+                print(f'{name}: индекс {indexed_ms:.2f} ms')
+                continue
+            like_ms = timed(like, options.repeat)
+            print(
+                f'{name}: LIKE {like_ms:.2f} ms -> индекс {indexed_ms:.2f} ms'
+            )
+            if plan:
+                print(plan)
+
+
+if __name__ == '__main__':
+    main()
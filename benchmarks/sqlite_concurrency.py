@@ -0,0 +1,165 @@
+"""Пропускная способность SQLite при одновременных чтении и записи.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.sqlite_concurrency --readers 4 --writers 2
+
+Для каждого режима создаётся своя база: stock - настройки SQLite по
+умолчанию (журнал отката), tuned - settings.SQLITE_PRAGMAS. Читатели -
+отдельные процессы, как воркеры gunicorn, - запрашивают ленты и страницы
+постов, писатели добавляют комментарии через add_comment. Кэш страниц
+отключён, чтобы каждый запрос шёл в базу.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+from benchmarks.utils import setup_django
+from benchmarks.views import generate, percentile
+
+MODES = ('stock', 'tuned')
+
+
+def prepare(mode, options):
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+    from posts.bulk import import_records
+
+    connections.close_all()
+    settings.DATABASES['default']['NAME'] = tempfile.mkstemp(
+        prefix=f'yatube-{mode}-', suffix='.db', dir=options.directory
+    )[1]
+    settings.SQLITE_PRAGMAS = options.pragmas if mode == 'tuned' else {}
+    call_command('migrate', verbosity=0)
+    import_records(generate(SimpleNamespace(
+        users=options.users, groups=options.groups, posts=options.posts,
+        comments=options.posts, follows=0, seed=options.seed,
+    )))
+    connections.close_all()
+    return settings.DATABASES['default']['NAME']
+
+
+def reader(client, rnd, options):
+    from django.urls import reverse
+
+    if rnd.random() < 0.5:
+        page = min(int(rnd.paretovariate(1.0)), options.pages)
+        return client.get(reverse('posts:index'), {'page': page})
+    post_id = rnd.randint(1, options.posts)
+    return client.get(reverse('posts:post_detail', args=[post_id]))
+
+
+def writer(client, rnd, options):
+    from django.urls import reverse
+
+    post_id = rnd.randint(1, options.posts)
+    return client.post(
+        reverse('posts:add_comment', args=[post_id]),
+        {'text': f'Комментарий из нагрузки {rnd.random()}'},
+    )
+
+
+def worker(role, seed, options, results):
+    from django.contrib.auth import get_user_model
+    from django.db import OperationalError
+    from django.test import Client
+
+    client = Client()
+    if role is writer:
+        client.force_login(get_user_model().objects.order_by('pk')[seed])
+    rnd = random.Random(seed)
+    timings, errors = [], 0
+    deadline = time.perf_counter() + options.duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            role(client, rnd, options)
+        except OperationalError:
+            errors += 1
+            continue
+        timings.append((time.perf_counter() - start) * 1000)
+    results.put((role.__name__, timings, errors))
+
+
+def run(mode, options):
+    database = prepare(mode, options)
+    try:
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        roles = [reader] * options.readers + [writer] * options.writers
+        processes = [
+            context.Process(
+                target=worker, args=(role, seed, options, results)
+            )
+            for seed, role in enumerate(roles)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+    summary = {}
+    for name in ('reader', 'writer'):
+        timings = [t for role, ts, _ in collected if role == name for t in ts]
+        errors = sum(e for role, _, e in collected if role == name)
+        summary[name] = (
+            len(timings) / options.duration,
+            percentile(timings, 95) if timings else 0.0,
+            errors,
+        )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument(
+        '--directory',
+        help='Каталог для баз; fsync на tmpfs почти бесплатен',
+    )
+    options = parser.parse_args()
+
+    setup_django(
+        ':memory:',
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+            },
+        },
+        TASKS_EAGER=True,
+        PROFILING_SAMPLE_RATE=0,
+    )
+    from django.conf import settings
+
+    options.pragmas = settings.SQLITE_PRAGMAS
+    print(
+        f'{"режим":<8} {"роль":<8} {"запросов/с":>11} '
+        f'{"p95, мс":>9} {"ошибок":>7}'
+    )
+    for mode in options.modes.split(','):
+        for role, (throughput, p95, errors) in run(mode, options).items():
+            print(
+                f'{mode:<8} {role:<8} {throughput:>11.0f} '
+                f'{p95:>9.1f} {errors:>7}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""Задержки страниц на синтетических данных через тестовый клиент Django.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.views --posts 100000 --output before.json
+    python -m benchmarks.views --posts 100000 --compare before.json
+
+Данные генерируются Faker и загружаются через posts.bulk во временную
+базу SQLite (или в --database). Для каждой страницы печатаются p50/p95/p99
+задержки, число SQL-запросов и размер ответа; --output сохраняет их в
+JSON, --compare сравнивает с сохранёнными ранее.
+"""
+import argparse
+import json
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.utils import ROOT_DIR, setup_django
+
+VIEWS = (
+    'index',
+    'group_posts',
+    'profile',
+    'post_detail',
+    'follow_index',
+    'post_create',
+)
+PERCENTILES = (50, 95, 99)
+
+
+def generate(options):
+    """Записи в формате posts.bulk: группы, посты, комментарии, подписки."""
+    from faker import Faker
+
+    fake = Faker('ru_RU')
+    fake.seed_instance(options.seed)
+    rnd = random.Random(options.seed)
+    usernames = [
+        f'{fake.user_name()}{number}' for number in range(options.users)
+    ]
+    slugs = [f'group-{number}' for number in range(options.groups)]
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    for slug in slugs:
+        yield {
+            'type': 'group',
+            'slug': slug,
+            'title': fake.catch_phrase()[:200],
+            'description': fake.paragraph(),
+        }
+    for number in range(1, options.posts + 1):
+        yield {
+            'type': 'post',
+            'id': number,
+            'text': fake.text(max_nb_chars=400),
+            'pub_date': (start + timedelta(minutes=number)).isoformat(),
+            'author': rnd.choice(usernames),
+            'group': rnd.choice(slugs) if rnd.random() < 0.7 else None,
+        }
+    for number in range(options.comments):
+        yield {
+            'type': 'comment',
+            'post': rnd.randint(1, options.posts),
+            'text': fake.sentence(),
+            'pub_date': (start + timedelta(seconds=number)).isoformat(),
+            'author': rnd.choice(usernames),
+        }
+    follower = usernames[0]
+    for author in rnd.sample(usernames[1:], options.follows):
+        yield {'type': 'follow', 'user': follower, 'author': author}
+
+
+def load(options):
+    from posts.bulk import import_records
+
+    start = time.perf_counter()
+    imported = import_records(generate(options))
+    elapsed = time.perf_counter() - start
+    print(f'Загружено {dict(imported)} за {elapsed:.1f} с')
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, round(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Scenario:
+    """Запросы к страницам со случайными параметрами."""
+
+    def __init__(self, options):
+        from django.contrib.auth import get_user_model
+        from django.test import Client
+        from posts.models import Follow, Group, Post
+
+        User = get_user_model()
+        self.rnd = random.Random(options.seed)
+        self.pages = options.pages
+        self.guest = Client()
+        self.follower = Client()
+        self.follower.force_login(User.objects.get(
+            pk=Follow.objects.values_list('user_id', flat=True).first()
+        ))
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.usernames = list(
+            User.objects.filter(posts__isnull=False).distinct().values_list(
+                'username', flat=True
+            )
+        )
+        self.post_ids = list(Post.objects.values_list('pk', flat=True))
+
+    def page(self):
+        return {'page': min(int(self.rnd.paretovariate(1.0)), self.pages)}
+
+    def request(self, view):
+        from django.urls import reverse
+
+        rnd = self.rnd
+        if view == 'index':
+            return self.guest.get(reverse('posts:index'), self.page())
+        if view == 'group_posts':
+            url = reverse('posts:group_list', args=[rnd.choice(self.slugs)])
+            return self.guest.get(url, self.page())
+        if view == 'profile':
+            url = reverse('posts:profile', args=[rnd.choice(self.usernames)])
+            return self.guest.get(url, self.page())
+        if view == 'post_detail':
+            post_id = rnd.choice(self.post_ids)
+            url = reverse('posts:post_detail', args=[post_id])
+            return self.guest.get(url)
+        if view == 'follow_index':
+            url = reverse('posts:follow_index')
+            return self.follower.get(url, self.page())
+        return self.follower.post(
+            reverse('posts:post_create'),
+            {'text': f'Пост из нагрузки {rnd.random()}'},
+        )
+
+
+def measure(scenario, view, options):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings, queries, sizes = [], [], []
+    for _ in range(options.warmup):
+        scenario.request(view)
+    for _ in range(options.requests):
+        if options.cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = scenario.request(view)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code not in (200, 302):
+            raise RuntimeError(f'{view}: ответ {response.status_code}')
+        queries.append(len(captured))
+        sizes.append(len(response.content))
+    result = {
+        f'p{percent}_ms': round(percentile(timings, percent), 3)
+        for percent in PERCENTILES
+    }
+    result['queries'] = round(sum(queries) / len(queries), 2)
+    result['bytes'] = round(sum(sizes) / len(sizes))
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def change(before, after):
+    if not before:
+        return ''
+    return f'{(after - before) / before:+.0%}'
+
+
+def report(results, baseline):
+    columns = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'bytes')
+    print(f'{"страница":<14}' + ''.join(f'{name:>16}' for name in columns))
+    for view, result in results.items():
+        before = baseline.get(view, {})
+        print(f'{view:<14}' + ''.join(
+            f'{result[name]:>10} {change(before.get(name), result[name]):>5}'
+            for name in columns
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--comments', type=int, default=200000)
+    parser.add_argument('--follows', type=int, default=50)
+    parser.add_argument('--views', default=','.join(VIEWS))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument(
+        '--cold', action='store_true',
+        help='Очищать кэш перед каждым запросом',
+    )
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database')
+    parser.add_argument('--output', help='Сохранить результаты в JSON')
+    parser.add_argument('--compare', help='JSON предыдущего запуска')
+    options = parser.parse_args()
+
+    database = setup_django(options.database)
+    from django.core.management import call_command
+
+    print(f'База: {database}')
+    call_command('migrate', verbosity=0)
+    load(options)
+    scenario = Scenario(options)
+    results = {
+        view: measure(scenario, view, options)
+        for view in options.views.split(',')
+    }
+    baseline = {}
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as stream:
+            baseline = json.load(stream)['results']
+    report(results, baseline)
+    if options.output:
+        data = {
+            'revision': git_revision(),
+            'options': {
+                name: value for name, value in vars(options).items()
+                if name not in ('output', 'compare', 'database')
+            },
+            'results': results,
+        }
+        with open(options.output, 'w', encoding='utf-8') as stream:
+            json.dump(data, stream, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
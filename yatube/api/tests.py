@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from posts.utils import COMMENTS_PER_PAGE, POST_PER_PAGE
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание группы",
+        )
+        cls.post = Post.objects.create(
+            text="Тестовый пост", author=cls.author, group=cls.group
+        )
+        cls.URL_POSTS = reverse("api:post_list")
+        cls.URL_GROUP = reverse("api:group_posts", args=[cls.group.slug])
+        cls.URL_PROFILE = reverse(
+            "api:profile_posts", args=[cls.author.username]
+        )
+        cls.URL_POST = reverse("api:post_detail", args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_return_compact_rows(self):
+        url_queries = (
+            (ApiTest.URL_POSTS, 1),
+            (ApiTest.URL_GROUP, 2),
+            (ApiTest.URL_PROFILE, 2),
+        )
+        for url, queries in url_queries:
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                data = response.json()
+                self.assertEqual(data["results"], [{
+                    "id": ApiTest.post.pk,
+                    "text": ApiTest.post.text,
+                    "pub_date": data["results"][0]["pub_date"],
+                    "author": ApiTest.author.username,
+                    "group": ApiTest.group.slug,
+                    "image": None,
+                }])
+                self.assertIsNone(data["next"])
+
+    def test_feed_cursor_pagination(self):
+        Post.objects.bulk_create(
+            Post(text=f"Пост #{number}", author=ApiTest.author)
+            for number in range(POST_PER_PAGE)
+        )
+        first = self.client.get(ApiTest.URL_POSTS).json()
+        second = self.client.get(
+            ApiTest.URL_POSTS, {"cursor": first["next"]}
+        ).json()
+        self.assertEqual(len(first["results"]), POST_PER_PAGE)
+        self.assertEqual(len(second["results"]), 1)
+        self.assertEqual(second["results"][0]["id"], ApiTest.post.pk)
+
+    def test_post_detail_with_comments(self):
+        Comment.objects.bulk_create(
+            Comment(post=ApiTest.post, author=ApiTest.author, text="Текст")
+            for _ in range(COMMENTS_PER_PAGE + 1)
+        )
+        data = self.client.get(ApiTest.URL_POST).json()
+        self.assertEqual(data["post"]["id"], ApiTest.post.pk)
+        self.assertEqual(len(data["results"]), COMMENTS_PER_PAGE)
+        self.assertIsNotNone(data["next"])
+        response = self.client.get(reverse("api:post_detail", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get_without_queries(self):
+        for url in (ApiTest.URL_POSTS, ApiTest.URL_POST):
+            response = self.client.get(url)
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    not_modified = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response["ETag"]
+                    )
+                self.assertEqual(not_modified.status_code, 304)
+                not_modified = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+                )
+                self.assertEqual(not_modified.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        changes = (
+            (ApiTest.URL_POSTS, lambda: Post.objects.create(
+                text="Новый пост", author=ApiTest.author
+            )),
+            (ApiTest.URL_POST, lambda: Comment.objects.create(
+                post=ApiTest.post, author=ApiTest.author, text="Текст"
+            )),
+        )
+        for url, change in changes:
+            etag = self.client.get(url)["ETag"]
+            change()
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_api_is_read_only(self):
+        response = self.client.post(ApiTest.URL_POSTS)
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,95 @@
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from posts.caching import conditional_feed
+from posts.models import Group, Post, User
+from posts.utils import (
+    CURSOR_PARAM,
+    POST_PER_PAGE,
+    KeysetPaginator,
+    comments_of_post,
+    get_comments_page,
+)
+
+POST_FIELDS = (
+    'pk', 'text', 'pub_date', 'author__username', 'group__slug', 'image'
+)
+COMMENT_FIELDS = ('pk', 'text', 'pub_date', 'author__username')
+
+
+def serialize_post(row):
+    return {
+        'id': row['pk'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': default_storage.url(row['image']) if row['image'] else None,
+    }
+
+
+def serialize_comment(row):
+    return {
+        'id': row['pk'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+    }
+
+
+def versioned(*names):
+    """Условный GET без разделения по пользователям: API одинаков для всех."""
+    def decorator(view):
+        return require_safe(conditional_feed(*names, per_user=False)(view))
+    return decorator
+
+
+def page_response(page, serialize, **extra):
+    return JsonResponse(
+        {
+            **extra,
+            'results': [serialize(row) for row in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        },
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def feed_response(request, post_list):
+    paginator = KeysetPaginator(post_list.values(*POST_FIELDS), POST_PER_PAGE)
+    return page_response(
+        paginator.get_page(request.GET.get(CURSOR_PARAM)), serialize_post
+    )
+
+
+@versioned('index')
+def post_list(request):
+    return feed_response(request, Post.objects.for_feed())
+
+
+@versioned('group:{slug}')
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group.posts.for_feed())
+
+
+@versioned('profile:{username}')
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.for_feed())
+
+
+@versioned('post:{post_id}')
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.for_feed().values(*POST_FIELDS), pk=post_id
+    )
+    comments = get_comments_page(
+        request, comments_of_post(post_id).values(*COMMENT_FIELDS)
+    )
+    return page_response(
+        comments, serialize_comment, post=serialize_post(post)
+    )
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Дольше этого страницы в кэше отдельного процесса заметно устаревают.
+LOCAL_CACHE_MAX_TIMEOUT = 60
+
+
+@register('caches')
+def check_page_cache(app_configs, **kwargs):
+    """Длинный PAGE_CACHE_TIMEOUT имеет смысл только с общим кэшем."""
+    backend = settings.CACHES['default']['BACKEND']
+    if (
+        backend == 'django.core.cache.backends.locmem.LocMemCache'
+        and settings.PAGE_CACHE_TIMEOUT > LOCAL_CACHE_MAX_TIMEOUT
+    ):
+        return [Warning(
+            'Кэш locmem свой у каждого процесса: изменения из других '
+            'воркеров и команд не будут видны до '
+            f'{settings.PAGE_CACHE_TIMEOUT} с.',
+            hint='Выберите общий кэш в CACHE_PROFILE или уменьшите '
+                 'PAGE_CACHE_TIMEOUT.',
+            id='core.W001',
+        )]
+    return []
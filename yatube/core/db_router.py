@@ -0,0 +1,31 @@
+"""Маршрутизация чтения на реплики.
+
+ReplicaMiddleware разрешает реплику на время одного запроса к странице
+только на чтение; всё остальное, включая любые записи, идёт в default.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+replica = ContextVar('replica', default=None)
+
+
+def use_replica():
+    if settings.DATABASE_REPLICAS:
+        replica.set(random.choice(settings.DATABASE_REPLICAS))
+
+
+def use_primary():
+    replica.set(None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return replica.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
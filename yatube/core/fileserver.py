@@ -0,0 +1,195 @@
+"""Раздача статики и медиа на уровне WSGI, в обход Django.
+
+Файлы с хешем в имени (статика после collectstatic, загрузки из
+core.storage, миниатюры sorl) не меняются, поэтому кэшируются браузером
+навсегда. Тело отдаётся через wsgi.file_wrapper - gunicorn отправляет
+его sendfile() без копирования через воркер; поддерживаются Range и
+заранее сжатые копии статики. С FILES_ACCEL_REDIRECT воркер вовсе не
+передаёт байты: он отвечает заголовком X-Accel-Redirect, и файл отдаёт
+nginx.
+"""
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from wsgiref.headers import Headers
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+BLOCK_SIZE = 64 * 1024
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=60'
+# app.0123456789ab.css у статики, sha256 у загрузок и md5 у миниатюр.
+HASHED_NAME = re.compile(r'(\.[0-9a-f]{12}\.|/[0-9a-f]{32,64}\.)[^/]*$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+STATUSES = {
+    200: '200 OK',
+    206: '206 Partial Content',
+    304: '304 Not Modified',
+    404: '404 Not Found',
+    405: '405 Method Not Allowed',
+    416: '416 Range Not Satisfiable',
+}
+
+
+def accepted_encodings(environ):
+    return {
+        value.split(';')[0].strip()
+        for value in environ.get('HTTP_ACCEPT_ENCODING', '').split(',')
+    }
+
+
+def not_modified(environ, etag, mtime):
+    if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in (tag.strip() for tag in if_none_match.split(','))
+    if_modified_since = environ.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def byte_range(environ, size, etag):
+    """(начало, конец) из заголовка Range или None для всего файла.
+
+    Несколько диапазонов сразу не поддерживаются: на них отдаётся весь
+    файл, как разрешает RFC 7233. Недопустимый диапазон - ValueError.
+    """
+    header = environ.get('HTTP_RANGE')
+    if not header or environ.get('HTTP_IF_RANGE', etag) != etag:
+        return None
+    match = RANGE.match(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end or not int(end):
+            raise ValueError(header)
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class FileServer:
+    """WSGI-обёртка: отдаёт STATIC_URL и MEDIA_URL сама, остальное
+    передаёт приложению."""
+
+    def __init__(self, application):
+        self.application = application
+        self.mounts = [
+            (settings.STATIC_URL, settings.STATIC_ROOT, True),
+            (settings.MEDIA_URL, settings.MEDIA_ROOT, False),
+        ]
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        for prefix, root, compressed in self.mounts:
+            if root and path.startswith(prefix):
+                return self.serve(
+                    environ, start_response, root, path[len(prefix):],
+                    compressed and not settings.FILES_ACCEL_REDIRECT,
+                )
+        return self.application(environ, start_response)
+
+    def serve(self, environ, start_response, root, name, compressed):
+        headers = Headers([])
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            headers['Allow'] = 'GET, HEAD'
+            return self.respond(start_response, 405, headers)
+        try:
+            full_path = safe_join(root, name)
+        except SuspiciousFileOperation:
+            return self.respond(start_response, 404, headers)
+        if not os.path.isfile(full_path):
+            return self.respond(start_response, 404, headers)
+        content_type, _ = mimetypes.guess_type(full_path)
+        headers['Content-Type'] = content_type or 'application/octet-stream'
+        if compressed:
+            suffix = self.negotiate(environ, full_path, headers)
+            full_path += suffix
+            name += suffix
+        stat = os.stat(full_path)
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        headers['ETag'] = etag
+        headers['Last-Modified'] = formatdate(stat.st_mtime, usegmt=True)
+        headers['Cache-Control'] = (
+            IMMUTABLE if HASHED_NAME.search('/' + name) else REVALIDATE
+        )
+        if not_modified(environ, etag, stat.st_mtime):
+            return self.respond(start_response, 304, headers)
+        if settings.FILES_ACCEL_REDIRECT:
+            # Range и сжатые копии (gzip_static) nginx обработает сам.
+            headers['X-Accel-Redirect'] = (
+                settings.FILES_ACCEL_REDIRECT + environ['PATH_INFO'][1:]
+            )
+            return self.respond(start_response, 200, headers)
+        return self.send(
+            environ, start_response, full_path, stat.st_size, etag, headers
+        )
+
+    def negotiate(self, environ, full_path, headers):
+        """Суффикс заранее сжатой копии, которую примет клиент, или ''."""
+        headers['Vary'] = 'Accept-Encoding'
+        accepted = accepted_encodings(environ)
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(full_path + suffix):
+                headers['Content-Encoding'] = encoding
+                return suffix
+        return ''
+
+    def send(self, environ, start_response, full_path, size, etag, headers):
+        """Отдаёт файл целиком или запрошенный диапазон байт."""
+        headers['Accept-Ranges'] = 'bytes'
+        try:
+            requested = byte_range(environ, size, etag)
+        except ValueError:
+            headers['Content-Range'] = f'bytes */{size}'
+            return self.respond(start_response, 416, headers)
+        status = 200
+        start, end = 0, size - 1
+        if requested is not None:
+            status = 206
+            start, end = requested
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        length = end - start + 1
+        headers['Content-Length'] = str(length)
+        start_response(STATUSES[status], headers.items())
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        return self.stream(environ, full_path, start, length, size)
+
+    def stream(self, environ, full_path, start, length, size):
+        stream = open(full_path, 'rb')
+        stream.seek(start)
+        # gunicorn отправляет sendfile() с текущей позиции не больше
+        # Content-Length байт; другие серверы отдали бы файл до конца.
+        if 'wsgi.file_wrapper' in environ and (
+            length == size
+            or environ.get('SERVER_SOFTWARE', '').startswith('gunicorn')
+        ):
+            return environ['wsgi.file_wrapper'](stream, BLOCK_SIZE)
+        return self.read(stream, length)
+
+    def read(self, stream, length):
+        with stream:
+            while length > 0:
+                chunk = stream.read(min(BLOCK_SIZE, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+    def respond(self, start_response, status, headers):
+        headers['Content-Length'] = '0'
+        start_response(STATUSES[status], headers.items())
+        return []
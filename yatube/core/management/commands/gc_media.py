@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from ...storage import orphans
+
+
+class Command(BaseCommand):
+    help = ('Удаляет загруженные файлы, на которые не ссылается ни одна '
+            'запись, вместе с их миниатюрами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+
+    def handle(self, *args, **options):
+        removed = freed = 0
+        for storage, name in orphans(options['grace']):
+            freed += storage.size(name)
+            removed += 1
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                delete(ImageFile(name, storage))
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} файлов: {removed}, {filesizeformat(freed)}'
+        ))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ... import metrics
+from ...queue import claim, discover, execute, requeue_stale
+
+
+class Command(BaseCommand):
+    help = 'Воркер очереди фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+
+    def handle(self, *args, **options):
+        discover()
+        done = failed = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                close_old_connections()
+                requeue_stale()
+                job = claim()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                if execute(job):
+                    done += 1
+                else:
+                    failed += 1
+                # Метрики задач (время миниатюр) попадают в /metrics
+                # только из файла процесса.
+                metrics.REGISTRY.flush()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            metrics.REGISTRY.flush(force=True)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Задач выполнено: {done}, с ошибкой: {failed} '
+            f'за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,248 @@
+"""Метрики в формате Prometheus, общие для воркеров одного хоста.
+
+Каждый процесс копит значения в памяти и не чаще раза в
+METRICS_FLUSH_INTERVAL секунд атомарно переписывает свой файл
+METRICS_DIR/<pid>.json. /metrics складывает файлы всех процессов, поэтому
+счётчики завершившихся воркеров не пропадают. После деплоя каталог можно
+очистить: Prometheus воспримет это как сброс счётчиков.
+"""
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+PREFIX = 'yatube_'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = tuple(
+    kilobytes * 1024 for kilobytes in (10, 100, 500, 1024, 5120, 10240)
+)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.values = {}
+        self.flushed = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def add(self, name, labels, size, deltas):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if self.pid != os.getpid():
+                # Дочерний процесс после fork не должен досчитывать
+                # значения родителя.
+                self.reset()
+            values = self.values.setdefault(key, [0] * size)
+            for index, delta in deltas:
+                values[index] += delta
+
+    def path(self, pid):
+        return os.path.join(settings.METRICS_DIR, f'{pid}.json')
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            data = [
+                [name, dict(labels), values]
+                for (name, labels), values in self.values.items()
+            ]
+            self.flushed = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(
+            dir=settings.METRICS_DIR, suffix='.tmp'
+        )
+        with os.fdopen(descriptor, 'w') as stream:
+            json.dump(data, stream)
+        os.replace(temporary, self.path(self.pid))
+
+    def collect(self):
+        """Значения всех процессов хоста: {(имя, метки): [числа]}."""
+        self.flush(force=True)
+        total = {}
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+            try:
+                with open(path) as stream:
+                    data = json.load(stream)
+            except (OSError, ValueError):
+                continue
+            for name, labels, values in data:
+                if name not in self.metrics:
+                    continue
+                key = (name, tuple(sorted(labels.items())))
+                current = total.setdefault(key, [0] * len(values))
+                for index, value in enumerate(values):
+                    current[index] += value
+        return total
+
+    def render(self):
+        total = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {PREFIX}{name} {metric.description}')
+            lines.append(f'# TYPE {PREFIX}{name} {metric.kind}')
+            lines.extend(metric.render(total))
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', r'\\').replace('"', r'\"')
+        )
+        for name, value in labels.items()
+    )
+    return f'{{{pairs}}}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, description, registry=None):
+        self.name = name
+        self.description = description
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def render(self, total):
+        for (name, labels), values in sorted(total.items()):
+            if name == self.name:
+                yield from self.samples(dict(labels), values)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self.name, labels, 1, [(0, amount)])
+
+    def samples(self, labels, values):
+        yield (
+            f'{PREFIX}{self.name}{format_labels(labels)} '
+            f'{format_value(values[0])}'
+        )
+
+
+class Histogram(Metric):
+    """Значения: счётчики корзин, затем сумма и число наблюдений."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, buckets, registry=None):
+        self.buckets = buckets
+        super().__init__(name, description, registry)
+
+    def observe(self, value, **labels):
+        size = len(self.buckets)
+        bucket = bisect_left(self.buckets, value)
+        deltas = [(size, value), (size + 1, 1)]
+        if bucket < size:
+            deltas.append((bucket, 1))
+        self.registry.add(self.name, labels, size + 2, deltas)
+
+    def samples(self, labels, values):
+        size = len(self.buckets)
+        cumulative = 0
+        for bound, count in zip(self.buckets, values):
+            cumulative += count
+            yield (
+                f'{PREFIX}{self.name}_bucket'
+                f'{format_labels({**labels, "le": format_value(bound)})} '
+                f'{cumulative}'
+            )
+        yield (
+            f'{PREFIX}{self.name}_bucket'
+            f'{format_labels({**labels, "le": "+Inf"})} {values[size + 1]}'
+        )
+        yield (
+            f'{PREFIX}{self.name}_sum{format_labels(labels)} '
+            f'{format_value(values[size])}'
+        )
+        yield (
+            f'{PREFIX}{self.name}_count{format_labels(labels)} '
+            f'{values[size + 1]}'
+        )
+
+
+class HitRatio(Metric):
+    """Доля result="hit" среди значений счётчика, считается при выдаче."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, description, counter, registry=None):
+        self.counter = counter
+        super().__init__(name, description, registry)
+
+    def render(self, total):
+        hits, requests = {}, {}
+        for (name, labels), values in total.items():
+            if name != self.counter.name:
+                continue
+            labels = dict(labels)
+            result = labels.pop('result', None)
+            key = tuple(sorted(labels.items()))
+            requests[key] = requests.get(key, 0) + values[0]
+            if result == 'hit':
+                hits[key] = hits.get(key, 0) + values[0]
+        for key, count in sorted(requests.items()):
+            yield (
+                f'{PREFIX}{self.name}{format_labels(dict(key))} '
+                f'{format_value(hits.get(key, 0) / count)}'
+            )
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = Histogram(
+    'request_duration_seconds',
+    'Время ответа по имени URL.',
+    LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'request_queries',
+    'Число SQL-запросов на один ответ по имени URL.',
+    QUERY_BUCKETS,
+)
+PAGE_CACHE_REQUESTS = Counter(
+    'page_cache_requests_total',
+    'Обращения к кэшу страниц лент: result="hit" или "miss".',
+)
+PAGE_CACHE_HIT_RATIO = HitRatio(
+    'page_cache_hit_ratio',
+    'Доля попаданий в кэш страниц лент с запуска воркеров.',
+    PAGE_CACHE_REQUESTS,
+)
+THUMBNAIL_DURATION = Histogram(
+    'thumbnail_generation_seconds',
+    'Время создания миниатюр одной картинки.',
+    LATENCY_BUCKETS,
+)
+UPLOAD_SIZE = Histogram(
+    'upload_size_bytes',
+    'Размер загруженных файлов.',
+    SIZE_BUCKETS,
+)
@@ -0,0 +1,147 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+
+from . import db_router, metrics
+from .profiling import profiled
+
+logger = logging.getLogger('core.profiling')
+
+PROFILE_PARAM = 'profile'
+
+
+class ProfilingMiddleware:
+    """Замеряет выборку запросов: заголовок Server-Timing, строка JSON
+    в логе core.profiling и панель для сотрудников с ?profile в адресе."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        # Сотрудник без сессии невозможен; кто он, станет известно только
+        # после AuthenticationMiddleware, то есть после ответа.
+        requested = PROFILE_PARAM in request.GET and (
+            settings.SESSION_COOKIE_NAME in request.COOKIES
+        )
+        if not sampled and not requested:
+            return self.get_response(request)
+        with profiled() as profile:
+            response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        staff = requested and user is not None and user.is_staff
+        if not sampled and not staff:
+            return response
+        response['Server-Timing'] = profile.server_timing()
+        match = getattr(request, 'resolver_match', None)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            **profile.as_dict(),
+        }, ensure_ascii=False))
+        if staff:
+            self.add_panel(request, response, profile)
+        return response
+
+    def add_panel(self, request, response, profile):
+        content_type = response.get('Content-Type', '')
+        if response.streaming or not content_type.startswith('text/html'):
+            return
+        content = response.content.decode(response.charset)
+        position = content.rfind('</body>')
+        if position == -1:
+            position = len(content)
+        panel = render_to_string(
+            'core/profiling_panel.html', {'profile': profile.as_dict()}
+        )
+        response.content = content[:position] + panel + content[position:]
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = len(response.content)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Время ответа, число SQL-запросов и размеры загрузок для /metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        metrics.REQUEST_DURATION.observe(duration, view=view)
+        metrics.REQUEST_QUERIES.observe(counter.count, view=view)
+        # Тело, которое представление не читало, не разбираем ради метрик.
+        if hasattr(request, '_files'):
+            for upload in request.FILES.values():
+                metrics.UPLOAD_SIZE.observe(upload.size)
+        metrics.REGISTRY.flush()
+        return response
+
+
+class ReplicaMiddleware:
+    """Страницы из REPLICA_VIEWS читают с реплики. После записи автор
+    запроса REPLICA_MAX_LAG секунд читает из основной базы, чтобы видеть
+    свои изменения, даже если реплика отстаёт."""
+
+    cookie = 'primary_until'
+    safe_methods = ('GET', 'HEAD')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.use_primary()
+        if request.method not in self.safe_methods and (
+            response.status_code < 400
+        ):
+            response.set_cookie(
+                self.cookie,
+                str(time.time() + settings.REPLICA_MAX_LAG),
+                max_age=settings.REPLICA_MAX_LAG,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in self.safe_methods
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+            and not self.sticky(request)
+        ):
+            db_router.use_replica()
+
+    def sticky(self, request):
+        try:
+            return float(request.COOKIES[self.cookie]) > time.time()
+        except (KeyError, ValueError):
+            return False
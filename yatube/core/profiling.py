@@ -0,0 +1,152 @@
+"""Замеры одного запроса: SQL, шаблоны и кэш.
+
+Обёртки ставятся один раз при старте и ничего не делают, пока для
+текущего запроса не начат замер: так профилирование с выборкой можно
+держать включённым в бою.
+"""
+import heapq
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+SQL_PREVIEW = 500
+
+current = ContextVar('profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest = []
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        entry = (duration, self.queries, sql[:SQL_PREVIEW])
+        if len(self.slowest) < settings.PROFILING_SLOWEST_QUERIES:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def slowest_queries(self):
+        return [
+            {'sql': sql, 'ms': round(duration * 1000, 2)}
+            for duration, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+    def as_dict(self):
+        return {
+            'duration_ms': round(self.duration * 1000, 2),
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'slowest': self.slowest_queries(),
+        }
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} SQL"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hit, {self.cache_misses} miss"',
+            f'total;dur={self.duration * 1000:.1f}',
+        ))
+
+
+def record_query(execute, sql, params, many, context):
+    profile = current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if profile is not None:
+            profile.add_query(sql, time.perf_counter() - start)
+
+
+@contextmanager
+def profiled():
+    """Замер запроса: SQL всех соединений, шаблоны и кэш."""
+    profile = RequestProfile()
+    token = current.set(profile)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            yield profile
+    finally:
+        profile.finish()
+        current.reset(token)
+
+
+def timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        profile = current.get()
+        if profile is None or profile.template_depth:
+            return render(self, context)
+        profile.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.template_time += time.perf_counter() - start
+            profile.template_depth -= 1
+    wrapper.profiled = True
+    return wrapper
+
+
+def counted_lookup(lookup, many):
+    @wraps(lookup)
+    def wrapper(self, keys, *args, **kwargs):
+        profile = current.get()
+        if profile is None or profile.cache_depth:
+            return lookup(self, keys, *args, **kwargs)
+        if many:
+            keys = list(keys)
+        default = args[0] if args else kwargs.get('default')
+        profile.cache_depth += 1
+        try:
+            found = lookup(self, keys, *args, **kwargs)
+        finally:
+            profile.cache_depth -= 1
+        if many:
+            hits = len(found)
+            profile.cache_hits += hits
+            profile.cache_misses += len(keys) - hits
+        elif found is None or found is default:
+            profile.cache_misses += 1
+        else:
+            profile.cache_hits += 1
+        return found
+    wrapper.profiled = True
+    return wrapper
+
+
+def install():
+    """Ставит обёртки рендера шаблонов и чтения из кэшей."""
+    if not getattr(Template.render, 'profiled', False):
+        Template.render = timed_render(Template.render)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        for name, many in (('get', False), ('get_many', True)):
+            method = getattr(backend, name)
+            if not getattr(method, 'profiled', False):
+                setattr(backend, name, counted_lookup(method, many))
@@ -0,0 +1,138 @@
+"""Очередь фоновых задач в базе данных, без внешнего брокера.
+
+Функция с декоратором @task ставится в очередь вызовом .delay(); воркер
+manage.py run_tasks забирает задачи по одной условным UPDATE, поэтому
+воркеров может быть несколько. Упавшая задача повторяется с растущей
+задержкой. При TASKS_EAGER (разработка и тесты) .delay() выполняет
+функцию сразу.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH = 10
+
+registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, max_retries, retry_delay, unique):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.unique = unique
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Ставит вызов в очередь; в режиме TASKS_EAGER выполняет сразу."""
+        if settings.TASKS_EAGER:
+            self.func(*args, **kwargs)
+            return None
+        arguments = json.dumps([args, kwargs], sort_keys=True)
+        key = f'{self.name}:{arguments}'[:255] if self.unique else ''
+        if key and Task.objects.filter(
+            key=key, status__in=(Task.QUEUED, Task.RUNNING)
+        ).exists():
+            return None
+        return Task.objects.create(
+            name=self.name, arguments=arguments, key=key
+        )
+
+    def retry_at(self, attempts):
+        return timezone.now() + timedelta(
+            seconds=self.retry_delay * 2 ** (attempts - 1)
+        )
+
+
+def task(max_retries=3, retry_delay=10, unique=False):
+    """Регистрирует функцию как фоновую задачу.
+
+    Аргументы вызова сохраняются в JSON. unique=True не ставит вызов,
+    если такой же уже ждёт в очереди или выполняется.
+    """
+    def decorator(func):
+        task_function = TaskFunction(func, max_retries, retry_delay, unique)
+        registry[task_function.name] = task_function
+        return task_function
+    return decorator
+
+
+def discover():
+    """Импортирует модули tasks всех приложений, чтобы задачи
+    зарегистрировались в воркере."""
+    autodiscover_modules('tasks')
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи воркеров, завершившихся посреди работы."""
+    return Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(
+            seconds=settings.TASKS_LOCK_TIMEOUT
+        ),
+    ).update(status=Task.QUEUED, locked_at=None)
+
+
+def claim():
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'pk').values_list('pk', flat=True)[:CLAIM_BATCH]
+    for pk in candidates:
+        claimed = Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    task_function = registry.get(job.name)
+    if task_function is None:
+        job.status = Task.FAILED
+        job.error = f'Неизвестная задача {job.name}'
+        job.save(update_fields=['status', 'error'])
+        return False
+    args, kwargs = json.loads(job.arguments)
+    try:
+        task_function.func(*args, **kwargs)
+    except Exception:
+        logger.exception('Задача %s #%s упала', job.name, job.pk)
+        job.error = traceback.format_exc()
+        if job.attempts > task_function.max_retries:
+            job.status = Task.FAILED
+        else:
+            job.status = Task.QUEUED
+            job.run_at = task_function.retry_at(job.attempts)
+        job.locked_at = None
+        job.save(update_fields=['status', 'run_at', 'locked_at', 'error'])
+        return False
+    job.delete()
+    return True
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи, пока они есть; возвращает их число."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim()
+        if job is None:
+            break
+        execute(job)
+        done += 1
+    return done
@@ -0,0 +1,119 @@
+"""Хранилище файлов с именами по содержимому.
+
+Файл сохраняется как <каталог upload_to>/ab/cd/<sha256><расширение>:
+одинаковые загрузки ложатся в один файл, а два уровня подкаталогов не
+дают одному каталогу разрастись. Имя не зависит от уже лежащих файлов,
+поэтому exists() на подбор свободного имени не вызывается. Файл может
+принадлежать нескольким записям, так что при удалении записи он не
+удаляется: осиротевшие файлы убирает manage.py gc_media.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import time
+import uuid
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils.deconstruct import deconstructible
+
+TEMPORARY_SUFFIX = '.tmp'
+HASHED_NAME = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.|$)')
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        digest = content_hash(content)
+        stem, extension = os.path.splitext(filename)
+        shards = posixpath.join(digest[:2], digest[2:4])
+        if stem == digest and directory.endswith(shards):
+            # Файл сохраняют под его же именем, например при импорте.
+            return name
+        return posixpath.join(directory, shards, digest + extension.lower())
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя выбирает _save() по содержимому.
+        return name
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Свежая дата защищает файл от gc_media, если до этого он
+            # был сиротой.
+            os.utime(self.path(name))
+            return name
+        # Пишем рядом и переименовываем: параллельная загрузка того же
+        # файла заменит его таким же содержимым.
+        temporary = super()._save(
+            f'{name}.{uuid.uuid4().hex}{TEMPORARY_SUFFIX}', content
+        )
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+
+def file_fields():
+    """Файловые поля моделей, хранящиеся в ContentAddressedStorage."""
+    return [
+        field
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, models.FileField)
+        and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def stored_files(storage, directory, cutoff):
+    """Имена файлов с именем по содержимому, изменённых до cutoff."""
+    root = storage.path(directory)
+    for path, _, filenames in os.walk(root):
+        for filename in filenames:
+            full_path = os.path.join(path, filename)
+            relative = os.path.relpath(full_path, root).replace(os.sep, '/')
+            if HASHED_NAME.match(relative) and (
+                os.path.getmtime(full_path) < cutoff
+            ):
+                yield posixpath.join(directory, relative)
+
+
+def orphans(grace):
+    """Пары (хранилище, имя) файлов без ссылок из записей.
+
+    Файлы моложе grace секунд не трогаются: запись о только что
+    загруженном файле может быть ещё не сохранена.
+    """
+    cutoff = time.time() - grace
+    candidates = []
+    referenced = set()
+    for field in file_fields():
+        directory = field.upload_to if isinstance(field.upload_to, str) else ''
+        candidates.extend(
+            (field.storage, name)
+            for name in stored_files(field.storage, directory, cutoff)
+        )
+        # Ссылки читаются после обхода каталогов: файл, сохранённый за
+        # это время, либо уже в ссылках, либо слишком молод.
+        referenced.update(
+            field.model._default_manager.exclude(
+                **{field.name: ''}
+            ).values_list(field.name, flat=True).iterator()
+        )
+    for storage, name in candidates:
+        if name in referenced:
+            continue
+        try:
+            if os.path.getmtime(storage.path(name)) >= cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        yield storage, name
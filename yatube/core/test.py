@@ -1,6 +1,46 @@
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
 from http import HTTPStatus
 
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    RequestFactory,
+    TestCase,
+    override_settings,
+)
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from posts import caching
+from posts.models import Post
+
+from . import db_router, metrics, queue
+from .cache_backends import SQLiteCache
+from .checks import check_page_cache
+from .fileserver import FileServer
+from .middleware import MetricsMiddleware, ReplicaMiddleware
+from .models import Task
+from .storage import ContentAddressedStorage
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +48,622 @@ class ViewTestClass(TestCase):
         response = self.client.get("/nonexisted-page/")
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, "core/404.html")
+
+
+@override_settings(
+    SQLITE_PRAGMAS={
+        "busy_timeout": 1234,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -2048,
+    }
+)
+class SQLiteTuningTest(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        tuned = connections["default"].__class__(
+            dict(
+                connections["default"].settings_dict,
+                NAME=os.path.join(directory, "db.sqlite3"),
+            ),
+            alias="tuned",
+        )
+        self.addCleanup(tuned.close)
+        with tuned.cursor() as cursor:
+            for pragma, expected in (
+                ("busy_timeout", 1234),
+                ("journal_mode", "wal"),
+                ("synchronous", 1),
+                ("cache_size", -2048),
+            ):
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f"PRAGMA {pragma}")
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+
+def increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr("counter")
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, "cache.sqlite3")
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_set_delete(self):
+        self.cache.set("key", {"value": 1})
+        self.assertEqual(self.cache.get("key"), {"value": 1})
+        self.assertTrue(self.cache.has_key("key"))
+        self.cache.delete("key")
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(self.cache.get("key", "default"), "default")
+
+    def test_add_only_missing_keys(self):
+        self.assertTrue(self.cache.add("key", 1))
+        self.assertFalse(self.cache.add("key", 2))
+        self.assertEqual(self.cache.get("key"), 1)
+
+    def test_add_ignores_culled_rows(self):
+        cache = SQLiteCache(
+            self.location, {"OPTIONS": {"MAX_ENTRIES": 10}}
+        )
+        self.assertTrue(cache.add("lock", 1, timeout=None))
+        for number in range(300):
+            # Каждая третья запись - add(), так что чистка придётся и на него.
+            cache.set_many({f"a{number}": 1, f"b{number}": 2}, timeout=60)
+            with self.subTest(number=number):
+                self.assertFalse(cache.add("lock", 2, timeout=None))
+        self.assertEqual(cache.get("lock"), 1)
+
+    def test_expired_keys(self):
+        self.cache.set("key", 1, timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertTrue(self.cache.add("key", 2))
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_many_and_clear(self):
+        self.cache.set_many({"a": 1, "b": 2}, timeout=None)
+        self.assertEqual(
+            self.cache.get_many(["a", "b", "c"]), {"a": 1, "b": 2}
+        )
+        self.cache.clear()
+        self.assertEqual(self.cache.get_many(["a", "b"]), {})
+
+    def test_shared_between_processes(self):
+        self.cache.set("counter", 0, timeout=None)
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(target=increment, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get("counter"), 200)
+
+    def test_cull(self):
+        cache = SQLiteCache(
+            self.location, {"OPTIONS": {"MAX_ENTRIES": 10}}
+        )
+        for number in range(200):
+            cache.set(f"key{number}", number)
+        self.assertLess(len(cache.get_many(
+            [f"key{number}" for number in range(200)]
+        )), 200)
+
+
+class PageCacheCheckTest(TestCase):
+    def test_long_timeout_with_local_cache(self):
+        cases = (
+            ("django.core.cache.backends.locmem.LocMemCache", 20, []),
+            ("django.core.cache.backends.locmem.LocMemCache", 86400,
+             ["core.W001"]),
+            ("core.cache_backends.SQLiteCache", 86400, []),
+        )
+        for backend, timeout, expected in cases:
+            with self.subTest(backend=backend, timeout=timeout):
+                with override_settings(
+                    CACHES={"default": {"BACKEND": backend}},
+                    PAGE_CACHE_TIMEOUT=timeout,
+                ):
+                    self.assertEqual(
+                        [error.id for error in check_page_cache(None)],
+                        expected,
+                    )
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+        cls.URL_INDEX = reverse("posts:index")
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        response = self.client.get(ProfilingMiddlewareTest.URL_INDEX)
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        with self.assertLogs("core.profiling") as logs:
+            response = self.client.get(ProfilingMiddlewareTest.URL_INDEX)
+        self.assertIn('SQL"', response["Server-Timing"])
+        self.assertIn("total;dur=", response["Server-Timing"])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "posts:index")
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["cache_misses"], 0)
+        self.assertGreater(record["template_ms"], 0)
+        self.assertLessEqual(len(record["slowest"]), record["queries"])
+        with self.assertLogs("core.profiling") as logs:
+            self.client.get(ProfilingMiddlewareTest.URL_INDEX)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record["cache_hits"], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_panel_only_for_staff(self):
+        url = f"{ProfilingMiddlewareTest.URL_INDEX}?profile"
+        reader_client = Client()
+        reader_client.force_login(
+            User.objects.create_user(username="reader")
+        )
+        for client in (self.client, reader_client):
+            with self.subTest(client=client):
+                with mock.patch("core.middleware.logger.info") as info:
+                    response = client.get(url)
+                info.assert_not_called()
+                self.assertFalse(response.has_header("Server-Timing"))
+                self.assertNotContains(response, "Профиль запроса")
+        self.client.force_login(ProfilingMiddlewareTest.staff)
+        with self.assertLogs("core.profiling"):
+            response = self.client.get(url)
+        self.assertTrue(response.has_header("Server-Timing"))
+        self.assertContains(response, "Профиль запроса")
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.URL_INDEX = reverse("posts:index")
+        cls.URL_METRICS = reverse("metrics")
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(
+            METRICS_DIR=self.directory, METRICS_FLUSH_INTERVAL=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        metrics.REGISTRY.reset()
+
+    def test_request_metrics(self):
+        for _ in range(2):
+            self.client.get(MetricsTest.URL_INDEX)
+        response = self.client.get(MetricsTest.URL_METRICS)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        for line in (
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            'yatube_request_queries_bucket{view="posts:index",le="+Inf"} 2',
+            'yatube_page_cache_requests_total{page="index",result="hit"} 1',
+            'yatube_page_cache_hit_ratio{page="index"} 0.5',
+        ):
+            with self.subTest(line=line):
+                self.assertContains(response, line)
+
+    def test_histogram_buckets(self):
+        histogram = metrics.Histogram(
+            "test_seconds", "Тест", (0.1, 1.0), registry=metrics.Registry()
+        )
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+        histogram.registry.flush(force=True)
+        self.assertEqual(
+            list(histogram.render(histogram.registry.collect())),
+            [
+                'yatube_test_seconds_bucket{le="0.1"} 1',
+                'yatube_test_seconds_bucket{le="1.0"} 2',
+                'yatube_test_seconds_bucket{le="+Inf"} 3',
+                "yatube_test_seconds_sum 5.55",
+                "yatube_test_seconds_count 3",
+            ],
+        )
+
+    def test_aggregates_worker_files(self):
+        metrics.PAGE_CACHE_REQUESTS.inc(page="index", result="miss")
+        with open(os.path.join(self.directory, "1.json"), "w") as stream:
+            json.dump([[
+                "page_cache_requests_total",
+                {"page": "index", "result": "miss"},
+                [4],
+            ]], stream)
+        response = self.client.get(MetricsTest.URL_METRICS)
+        self.assertContains(
+            response,
+            'yatube_page_cache_requests_total{page="index",result="miss"} 5',
+        )
+
+    def test_unread_uploads_not_parsed(self):
+        request = RequestFactory().post(
+            "/", {"image": ContentFile(b"data", name="image.gif")}
+        )
+        MetricsMiddleware(lambda request: HttpResponse())(request)
+        self.assertFalse(hasattr(request, "_files"))
+
+    @override_settings(TASKS_EAGER=False)
+    def test_worker_flushes_metrics(self):
+        measure.delay()
+        call_command("run_tasks", once=True, stdout=StringIO())
+        with open(metrics.REGISTRY.path(os.getpid())) as stream:
+            names = [name for name, _, _ in json.load(stream)]
+        self.assertIn("thumbnail_generation_seconds", names)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token(self):
+        response = self.client.get(MetricsTest.URL_METRICS)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.client.get(
+            MetricsTest.URL_METRICS, HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+calls = []
+
+
+@queue.task(retry_delay=0, unique=True)
+def remember(value):
+    calls.append(value)
+
+
+@queue.task()
+def measure():
+    metrics.THUMBNAIL_DURATION.observe(0.1)
+
+
+@queue.task(max_retries=1, retry_delay=60)
+def explode():
+    raise ValueError("boom")
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_and_run(self):
+        remember.delay("a")
+        remember.delay("a")
+        remember.delay("b")
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertEqual(calls, [])
+        self.assertEqual(queue.run_pending(), 2)
+        self.assertEqual(calls, ["a", "b"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_unique_task_not_queued_while_running(self):
+        remember.delay("a")
+        Task.objects.update(status=Task.RUNNING, locked_at=timezone.now())
+        self.assertIsNone(remember.delay("a"))
+        self.assertEqual(Task.objects.count(), 1)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager(self):
+        remember.delay("a")
+        self.assertEqual(calls, ["a"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_then_fail(self):
+        job = explode.delay()
+        with self.assertLogs("core.queue"):
+            queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("boom", job.error)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(queue.run_pending(), 0)
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs("core.queue"):
+            queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+
+    def test_stale_tasks_requeued(self):
+        job = remember.delay("a")
+        Task.objects.update(
+            status=Task.RUNNING,
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+        self.assertEqual(queue.run_pending(), 0)
+        self.assertEqual(queue.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.QUEUED)
+
+    def test_worker_command(self):
+        remember.delay("a")
+        out = StringIO()
+        call_command("run_tasks", once=True, stdout=out)
+        self.assertEqual(calls, ["a"])
+        self.assertIn("Задач выполнено: 1", out.getvalue())
+
+    def test_password_reset_email_queued(self):
+        User.objects.create_user(
+            username="reader", email="reader@mail.ru", password="pass"
+        )
+        self.client.post(
+            reverse("users:password_reset"), {"email": "reader@mail.ru"}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        queue.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["reader@mail.ru"])
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], REPLICA_MAX_LAG=5)
+class ReplicaRoutingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.factory = RequestFactory()
+        cls.router = db_router.ReplicaRouter()
+        cls.URL_INDEX = reverse("posts:index")
+        cls.URL_CREATE = reverse("posts:post_create")
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(db_router.use_primary)
+        self.seen = []
+        self.middleware = ReplicaMiddleware(self.get_response)
+
+    def get_response(self, request):
+        self.middleware.process_view(request, None, (), {})
+        self.seen.append(ReplicaRoutingTest.router.db_for_read(Post))
+        return HttpResponse()
+
+    def request(self, method, url, **cookies):
+        request = getattr(ReplicaRoutingTest.factory, method)(url)
+        request.COOKIES.update(cookies)
+        request.resolver_match = resolve(url)
+        return self.middleware(request)
+
+    def test_reads_routed_by_view(self):
+        cases = (
+            ("get", ReplicaRoutingTest.URL_INDEX, "replica1"),
+            ("get", ReplicaRoutingTest.URL_CREATE, "default"),
+            ("post", ReplicaRoutingTest.URL_INDEX, "default"),
+        )
+        for method, url, alias in cases:
+            with self.subTest(method=method, url=url):
+                self.seen.clear()
+                self.request(method, url)
+                self.assertEqual(self.seen, [alias])
+                self.assertIsNone(db_router.replica.get())
+
+    def test_writes_go_to_primary(self):
+        db_router.use_replica()
+        self.assertEqual(
+            ReplicaRoutingTest.router.db_for_write(Post), "default"
+        )
+
+    def test_write_pins_author_to_primary(self):
+        response = self.request("post", ReplicaRoutingTest.URL_CREATE)
+        cookie = response.cookies[ReplicaMiddleware.cookie]
+        self.assertEqual(cookie["max-age"], 5)
+        self.request(
+            "get", ReplicaRoutingTest.URL_INDEX,
+            **{ReplicaMiddleware.cookie: cookie.value},
+        )
+        self.request(
+            "get", ReplicaRoutingTest.URL_INDEX,
+            **{ReplicaMiddleware.cookie: str(time.time() - 1)},
+        )
+        self.assertEqual(self.seen, ["default", "default", "replica1"])
+
+    def test_fresh_versions_read_from_primary(self):
+        request = ReplicaRoutingTest.factory.get(ReplicaRoutingTest.URL_INDEX)
+        db_router.use_replica()
+        caching.request_versions(request, ["index"], {})
+        self.assertIsNone(db_router.replica.get())
+        cache.set_many(
+            {
+                caching.version_key(name): caching.now_version() - 60000
+                for name in (caching.SITE_VERSION, "index")
+            },
+            timeout=None,
+        )
+        request = ReplicaRoutingTest.factory.get(ReplicaRoutingTest.URL_INDEX)
+        db_router.use_replica()
+        caching.request_versions(request, ["index"], {})
+        self.assertEqual(db_router.replica.get(), "replica1")
+
+
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(MEDIA_ROOT=directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create_post(self, content):
+        post = Post(text="Пост", author=ContentAddressedStorageTest.author)
+        post.image.save("picture.GIF", ContentFile(content), save=False)
+        post.save()
+        return post
+
+    def age(self, *names):
+        for name in names:
+            os.utime(default_storage.path(name), (0, 0))
+
+    def test_identical_uploads_share_file(self):
+        first = self.create_post(b"same")
+        second = self.create_post(b"same")
+        self.assertIsInstance(
+            default_storage._wrapped, ContentAddressedStorage
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r"^posts/([0-9a-f]{2})/([0-9a-f]{2})/\1\2"
+        )
+        self.assertTrue(first.image.name.endswith(".gif"))
+        self.assertNotEqual(
+            self.create_post(b"other").image.name, first.image.name
+        )
+        self.assertEqual(
+            default_storage.save(first.image.name, ContentFile(b"same")),
+            first.image.name,
+        )
+
+    def test_gc_removes_orphans(self):
+        edited = self.create_post(b"old")
+        replaced = edited.image.name
+        edited.image.save("new.gif", ContentFile(b"new"))
+        deleted = self.create_post(b"deleted")
+        deleted.delete()
+        shared = self.create_post(b"shared")
+        self.create_post(b"shared").delete()
+        fresh = default_storage.save("posts/fresh.gif", ContentFile(b"fresh"))
+        self.age(
+            replaced, deleted.image.name, edited.image.name, shared.image.name
+        )
+        out = StringIO()
+        call_command("gc_media", dry_run=True, stdout=out)
+        self.assertIn(replaced, out.getvalue())
+        self.assertTrue(default_storage.exists(replaced))
+        call_command("gc_media", stdout=out)
+        for name, exists in (
+            (replaced, False),
+            (deleted.image.name, False),
+            (edited.image.name, True),
+            (shared.image.name, True),
+            (fresh, True),
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(default_storage.exists(name), exists)
+        self.assertIn("Удалено файлов: 2", out.getvalue())
+
+
+class FileServingTest(TestCase):
+    CSS = b"body { color: black; }\n" * 200
+    IMAGE = "posts/ab/cd/" + "abcd" * 16 + ".jpg"
+
+    def setUp(self):
+        source, static_root, media_root = (tempfile.mkdtemp() for _ in "123")
+        for directory in (source, static_root, media_root):
+            self.addCleanup(shutil.rmtree, directory)
+        os.makedirs(os.path.join(source, "css"))
+        with open(os.path.join(source, "css", "site.css"), "wb") as css:
+            css.write(FileServingTest.CSS)
+        os.makedirs(os.path.dirname(os.path.join(media_root, self.IMAGE)))
+        with open(os.path.join(media_root, self.IMAGE), "wb") as image:
+            image.write(b"0123456789")
+        settings = override_settings(
+            STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=[
+                "django.contrib.staticfiles.finders.FileSystemFinder"
+            ],
+            STATICFILES_STORAGE="core.staticfiles.CompressedManifestStorage",
+            STATIC_ROOT=static_root,
+            MEDIA_ROOT=media_root,
+            FILES_ACCEL_REDIRECT="",
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        self.server = FileServer(self.application)
+
+    def application(self, environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"django"]
+
+    def request(self, path, **headers):
+        response = {}
+
+        def start_response(status, headers):
+            response.update(status=status, headers=dict(headers))
+
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, **headers}
+        body = b"".join(self.server(environ, start_response))
+        return response["status"], response["headers"], body
+
+    def test_hashed_static_served_compressed(self):
+        name = staticfiles_storage.stored_name("css/site.css")
+        self.assertRegex(name, r"^css/site\.[0-9a-f]{12}\.css$")
+        status, headers, body = self.request(
+            f"/static/{name}", HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Content-Type"], "text/css")
+        self.assertIn("immutable", headers["Cache-Control"])
+        self.assertEqual(gzip.decompress(body), FileServingTest.CSS)
+        status, _, body = self.request(
+            f"/static/{name}", HTTP_IF_NONE_MATCH=headers["ETag"],
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(status, "304 Not Modified")
+        self.assertEqual(body, b"")
+        status, headers, _ = self.request("/static/css/site.css")
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertNotIn("immutable", headers["Cache-Control"])
+
+    def test_media_ranges(self):
+        url = f"/media/{FileServingTest.IMAGE}"
+        for range_header, status, content_range, body in (
+            ("bytes=2-5", "206 Partial Content", "bytes 2-5/10", b"2345"),
+            ("bytes=-3", "206 Partial Content", "bytes 7-9/10", b"789"),
+            ("bytes=20-", "416 Range Not Satisfiable", "bytes */10", b""),
+        ):
+            with self.subTest(range=range_header):
+                response = self.request(url, HTTP_RANGE=range_header)
+                self.assertEqual(response[0], status)
+                self.assertEqual(response[1]["Content-Range"], content_range)
+                self.assertEqual(response[2], body)
+        status, headers, body = self.request(url)
+        self.assertEqual(body, b"0123456789")
+        self.assertIn("immutable", headers["Cache-Control"])
+
+    def test_other_paths(self):
+        for path, status, body in (
+            ("/media/../../etc/passwd", "404 Not Found", b""),
+            ("/media/posts/missing.jpg", "404 Not Found", b""),
+            ("/about/author/", "200 OK", b"django"),
+        ):
+            with self.subTest(path=path):
+                response = self.request(path)
+                self.assertEqual(response[0], status)
+                self.assertEqual(response[2], body)
+
+    def test_accel_redirect(self):
+        with override_settings(FILES_ACCEL_REDIRECT="/protected/"):
+            status, headers, body = self.request(
+                f"/media/{FileServingTest.IMAGE}"
+            )
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(
+            headers["X-Accel-Redirect"],
+            f"/protected/media/{FileServingTest.IMAGE}",
+        )
+        self.assertEqual(body, b"")
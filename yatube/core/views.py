@@ -1,4 +1,10 @@
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+
+from . import metrics as registry
 
 
 def page_not_found(request, exception):
@@ -17,3 +23,16 @@ def server_error(request):
 
 def permisson_denied(request, exception):
     return render(request, "core/403.html", {"path": request.path}, status=403)
+
+
+@require_safe
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        return HttpResponse(status=403)
+    return HttpResponse(
+        registry.REGISTRY.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,321 @@
+"""Потоковые выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Запись - словарь с полем type: group, post, comment или follow. Выгрузка
+идёт в порядке зависимостей, поэтому загрузка однопроходная: посты
+сохраняют свои id, а комментарии ссылаются на них. Авторы и группы
+ищутся через кэш в памяти, недостающие создаются.
+"""
+import csv
+import json
+import os
+import shutil
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 1000
+LOOKUP_CHUNK = 500
+FORMATS = ('jsonl', 'csv')
+KINDS = ('group', 'post', 'comment', 'follow')
+FIELDS = (
+    'type', 'id', 'slug', 'title', 'description', 'text', 'pub_date',
+    'author', 'group', 'image', 'post', 'user',
+)
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return extension if extension in FORMATS else 'jsonl'
+
+
+def copy_image(name, images_dir):
+    target = os.path.join(images_dir, name)
+    if os.path.exists(target) or not default_storage.exists(name):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with default_storage.open(name, 'rb') as source:
+        with open(target, 'wb') as destination:
+            shutil.copyfileobj(source, destination)
+
+
+def export_records(images_dir=None):
+    """Генератор записей всех данных; картинки копируются в images_dir."""
+    groups = Group.objects.order_by('pk').values_list(
+        'slug', 'title', 'description'
+    )
+    for slug, title, description in groups.iterator(BATCH_SIZE):
+        yield {
+            'type': 'group',
+            'slug': slug,
+            'title': title,
+            'description': description,
+        }
+    posts = Post.objects.order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'author__username', 'group__slug', 'image'
+    )
+    for pk, text, pub_date, author, group, image in posts.iterator(
+        BATCH_SIZE
+    ):
+        if image and images_dir:
+            copy_image(image, images_dir)
+        yield {
+            'type': 'post',
+            'id': pk,
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'author': author,
+            'group': group,
+            'image': image or None,
+        }
+    comments = Comment.objects.order_by('pk').values_list(
+        'post_id', 'text', 'pub_date', 'author__username'
+    )
+    for post_id, text, pub_date, author in comments.iterator(BATCH_SIZE):
+        yield {
+            'type': 'comment',
+            'post': post_id,
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'author': author,
+        }
+    follows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username'
+    )
+    for user, author in follows.iterator(BATCH_SIZE):
+        yield {'type': 'follow', 'user': user, 'author': author}
+
+
+def write_records(records, stream, file_format):
+    """Пишет записи в поток и возвращает их число по типам."""
+    written = Counter()
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+    for record in records:
+        write(record)
+        written[record['type']] += 1
+    return written
+
+
+def read_records(stream, file_format):
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise ValueError(f'Строка {number}: {error}')
+
+
+def to_int(value):
+    return int(value) if value not in (None, '') else None
+
+
+def to_datetime(value):
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'Неверная дата: {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+@contextmanager
+def explicit_dates(*models):
+    """bulk_create заполняет auto_now_add текущим временем даже поверх
+    переданных дат, поэтому на время загрузки оно отключается."""
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Копит записи пачками и сохраняет каждую пачку в своей транзакции.
+
+    Память ограничена размером пачки и кэшем имён авторов и групп.
+    """
+
+    def __init__(self, images_dir=None, batch_size=BATCH_SIZE):
+        self.images_dir = images_dir
+        self.batch_size = batch_size
+        self.users = {}
+        self.groups = {}
+        self.pending = {kind: [] for kind in KINDS}
+        self.imported = Counter()
+        self.password = make_password(None)
+
+    def add(self, record):
+        kind = record.get('type')
+        if kind not in self.pending:
+            raise ValueError(f'Неизвестный тип записи: {kind!r}')
+        self.pending[kind].append(record)
+        if len(self.pending[kind]) >= self.batch_size:
+            self.flush()
+
+    def resolve(self, cache, model, field, values, create):
+        missing = {value for value in values if value not in cache}
+        for _ in range(2):
+            found = list(missing)
+            for start in range(0, len(found), LOOKUP_CHUNK):
+                cache.update(model.objects.filter(**{
+                    f'{field}__in': found[start:start + LOOKUP_CHUNK]
+                }).values_list(field, 'pk'))
+            missing -= cache.keys()
+            if not missing:
+                break
+            model.objects.bulk_create(
+                map(create, missing), ignore_conflicts=True
+            )
+
+    def user_ids(self, usernames):
+        self.resolve(
+            self.users, User, 'username', usernames,
+            lambda username: User(username=username, password=self.password),
+        )
+        return self.users
+
+    def group_ids(self, slugs):
+        self.resolve(
+            self.groups, Group, 'slug', slugs,
+            lambda slug: Group(slug=slug, title=slug, description=''),
+        )
+        return self.groups
+
+    def image(self, name):
+        if not name or not self.images_dir:
+            return name or ''
+        if default_storage.exists(name):
+            return name
+        path = os.path.join(self.images_dir, name)
+        if not os.path.exists(path):
+            raise ValueError(f'Нет файла картинки: {path}')
+        with open(path, 'rb') as image:
+            return default_storage.save(name, File(image))
+
+    def save_groups(self, records):
+        Group.objects.bulk_create(
+            (
+                Group(
+                    slug=record['slug'],
+                    title=record.get('title') or record['slug'],
+                    description=record.get('description') or '',
+                )
+                for record in records
+            ),
+            ignore_conflicts=True,
+        )
+        self.group_ids(record['slug'] for record in records)
+
+    def save_posts(self, records):
+        users = self.user_ids({record['author'] for record in records})
+        groups = self.group_ids(
+            {record['group'] for record in records if record.get('group')}
+        )
+        Post.objects.bulk_create(
+            Post(
+                pk=to_int(record.get('id')),
+                text=record['text'],
+                pub_date=to_datetime(record.get('pub_date')),
+                author_id=users[record['author']],
+                group_id=groups.get(record.get('group')),
+                image=self.image(record.get('image')),
+            )
+            for record in records
+        )
+
+    def save_comments(self, records):
+        users = self.user_ids({record['author'] for record in records})
+        Comment.objects.bulk_create(
+            Comment(
+                post_id=to_int(record['post']),
+                text=record['text'],
+                pub_date=to_datetime(record.get('pub_date')),
+                author_id=users[record['author']],
+            )
+            for record in records
+        )
+
+    def save_follows(self, records):
+        users = self.user_ids({
+            username for record in records
+            for username in (record['user'], record['author'])
+        })
+        Follow.objects.bulk_create(
+            (
+                Follow(
+                    user_id=users[record['user']],
+                    author_id=users[record['author']],
+                )
+                for record in records
+                if record['user'] != record['author']
+            ),
+            ignore_conflicts=True,
+        )
+
+    def flush(self):
+        savers = {
+            'group': self.save_groups,
+            'post': self.save_posts,
+            'comment': self.save_comments,
+            'follow': self.save_follows,
+        }
+        with transaction.atomic(), explicit_dates(Post, Comment):
+            for kind in KINDS:
+                records = self.pending[kind]
+                if records:
+                    savers[kind](records)
+                    self.imported[kind] += len(records)
+        self.pending = {kind: [] for kind in KINDS}
+
+    def repair(self):
+        """Обновляет то, что bulk_create обходит: последовательности id,
+        счётчики, ленты, поиск и кэш страниц.
+
+        Вызывается и после сбоя посреди загрузки: уже сохранённые пачки
+        остаются в базе и должны быть согласованы с остальными данными.
+        """
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [Post]
+                ):
+                    cursor.execute(sql)
+            counters.recount()
+            timeline.rebuild()
+            search.rebuild()
+        caching.bump_versions(caching.SITE_VERSION)
+
+
+def import_records(records, images_dir=None, batch_size=BATCH_SIZE):
+    importer = Importer(images_dir, batch_size)
+    try:
+        for record in records:
+            importer.add(record)
+        importer.flush()
+    finally:
+        importer.repair()
+    return importer.imported
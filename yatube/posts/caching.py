@@ -0,0 +1,212 @@
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from core import db_router, metrics
+
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.05
+LOCK_ATTEMPTS = 40
+SITE_VERSION = 'site'
+
+
+def version_key(name):
+    return f'posts:version:{name}'
+
+
+def now_version():
+    return int(time.time() * 1000)
+
+
+def get_versions(names):
+    # Ключ версии создаётся и для адреса, которого нет (404), поэтому
+    # живёт не дольше страниц. Пропавшая версия заводится заново с текущим
+    # временем, а оно больше прежних, так что старые страницы не вернутся.
+    keys = {version_key(name): name for name in names}
+    found = cache.get_many(keys)
+    missing = {key: now_version() for key in keys if key not in found}
+    for key, version in missing.items():
+        if not cache.add(key, version, timeout=settings.PAGE_CACHE_TIMEOUT):
+            missing[key] = cache.get(key, version)
+    found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump_versions(*names):
+    keys = [version_key(name) for name in names]
+    current = cache.get_many(keys)
+    now = now_version()
+    cache.set_many(
+        {key: max(now, current.get(key, 0) + 1) for key in keys},
+        timeout=settings.PAGE_CACHE_TIMEOUT,
+    )
+
+
+def page_key(request, names):
+    versions = get_versions([SITE_VERSION, *names])
+    path = md5(request.get_full_path().encode()).hexdigest()
+    user = request.user.pk or 'anon'
+    version = '.'.join(str(versions[name]) for name in sorted(versions))
+    return f'posts:page:{version}:{user}:{path}'
+
+
+def get_or_render(key, render):
+    response = cache.get(key)
+    if response is not None:
+        return response
+    lock = f'{key}:lock'
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock, 1, LOCK_TIMEOUT):
+            try:
+                response = render()
+                if response.status_code == 200 and not response.cookies:
+                    cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+                return response
+            finally:
+                cache.delete(lock)
+        time.sleep(LOCK_WAIT)
+        response = cache.get(key)
+        if response is not None:
+            return response
+    return render()
+
+
+def cache_feed(*names):
+    """Кэширует страницу ленты под ключом с версиями из names.
+
+    Имена форматируются аргументами представления: 'group:{slug}'.
+    Версии повышаются сигналами при изменении постов, групп и комментариев.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            key = page_key(
+                request, [name.format(**kwargs) for name in names]
+            )
+            rendered = []
+
+            def render():
+                rendered.append(True)
+                return view(request, *args, **kwargs)
+
+            response = get_or_render(key, render)
+            metrics.PAGE_CACHE_REQUESTS.inc(
+                page=view.__name__, result='miss' if rendered else 'hit'
+            )
+            return response
+        return wrapper
+    return decorator
+
+
+def request_versions(request, names, kwargs):
+    if not hasattr(request, 'feed_versions'):
+        resolved = []
+        for name in names:
+            if callable(name):
+                resolved.extend(name(**kwargs))
+            else:
+                resolved.append(name.format(**kwargs))
+        request.feed_versions = get_versions([SITE_VERSION, *resolved])
+        if now_version() - max(request.feed_versions.values()) < (
+            settings.REPLICA_MAX_LAG * 1000
+        ):
+            # Данные страницы только что менялись: реплика может их ещё
+            # не видеть, а отрисованная с неё страница попала бы в кэш.
+            db_router.use_primary()
+    return request.feed_versions
+
+
+def conditional_feed(*names, per_user=True, max_age=None):
+    """Условный GET (ETag, Last-Modified) и Cache-Control для ленты.
+
+    Валидаторы считаются по тем же версиям, что и ключи cache_feed, и
+    ответ 304 отдаётся без запросов к базе и рендеринга шаблонов. Имя
+    может быть функцией от аргументов представления, возвращающей имена.
+    Страницы с per_user различаются по пользователю: прокси кэширует
+    только анонимные, а браузер залогиненного каждый раз их сверяет.
+    """
+    def etag(request, **kwargs):
+        versions = request_versions(request, names, kwargs)
+        key = '.'.join(f'{name}={versions[name]}' for name in sorted(versions))
+        user = (request.user.pk or 'anon') if per_user else ''
+        if per_user and request.user.is_authenticated:
+            # При новом входе меняются сессия и секрет CSRF: страница с
+            # формой из кэша браузера отправила бы старый токен.
+            user = (
+                f'{user}:{request.session.session_key}:'
+                f'{request.META.get("CSRF_COOKIE", "")}'
+            )
+        return md5(
+            f'{key}|{user}|{request.get_full_path()}'.encode()
+        ).hexdigest()
+
+    def last_modified(request, **kwargs):
+        if per_user and request.user.is_authenticated:
+            return None
+        versions = request_versions(request, names, kwargs)
+        return datetime.fromtimestamp(
+            max(versions.values()) / 1000, tz=timezone.utc
+        )
+
+    def decorator(view):
+        conditional = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if per_user:
+                patch_vary_headers(response, ('Cookie',))
+            if per_user and request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(
+                    response,
+                    public=True,
+                    max_age=(
+                        settings.FEED_CACHE_MAX_AGE
+                        if max_age is None else max_age
+                    ),
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+def post_versions(post, previous_group_slug=None):
+    names = ['index', f'post:{post.pk}', f'profile:{post.author.username}']
+    if post.group_id:
+        names.append(f'group:{post.group.slug}')
+    if previous_group_slug:
+        names.append(f'group:{previous_group_slug}')
+    return names
+
+
+def card_versions(post):
+    return (
+        f'card-post:{post.pk}',
+        f'card-group:{post.group_id}',
+        f'card-author:{post.author_id}',
+    )
+
+
+def attach_card_versions(page):
+    page.object_list = list(page.object_list)
+    names = set()
+    for post in page.object_list:
+        names.update(card_versions(post))
+    versions = get_versions(names)
+    for post in page.object_list:
+        post.card_version = '.'.join(
+            str(versions[name]) for name in card_versions(post)
+        )
+    return page
@@ -0,0 +1,149 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Profile
+
+from .models import Comment, Follow, Group, Post, SiteCounter, User
+
+ALL_POSTS = 'posts'
+
+
+def all_posts_count():
+    # Счётчик в базе, а не в кэше: кэш по умолчанию свой у каждого
+    # процесса, и посты из других воркеров и команд в него не попадали.
+    count = SiteCounter.objects.filter(pk=ALL_POSTS).values_list(
+        'value', flat=True
+    ).first()
+    if count is None:
+        # Строки нет после flush или в базе, созданной без миграций.
+        count = Post.objects.count()
+        SiteCounter.objects.get_or_create(
+            pk=ALL_POSTS, defaults={'value': count}
+        )
+    return count
+
+
+def change(model, pk, **deltas):
+    if pk is not None:
+        model.objects.filter(pk=pk).update(**{
+            field: Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        })
+
+
+def change_all_posts(delta):
+    change(SiteCounter, ALL_POSTS, value=delta)
+
+
+def post_added(post):
+    change_all_posts(1)
+    change(Profile, post.author_id, posts_count=1)
+    change(Group, post.group_id, posts_count=1)
+
+
+def post_removed(post):
+    change_all_posts(-1)
+    change(Profile, post.author_id, posts_count=-1)
+    change(Group, post.group_id, posts_count=-1)
+
+
+def post_moved(previous_group_id, group_id):
+    change(Group, previous_group_id, posts_count=-1)
+    change(Group, group_id, posts_count=1)
+
+
+def comment_added(comment):
+    change(Post, comment.post_id, comments_count=1)
+
+
+def comment_removed(comment):
+    change(Post, comment.post_id, comments_count=-1)
+
+
+def follow_added(follow):
+    change(Profile, follow.author_id, followers_count=1)
+    change(Profile, follow.user_id, following_count=1)
+
+
+def follow_removed(follow):
+    change(Profile, follow.author_id, followers_count=-1)
+    change(Profile, follow.user_id, following_count=-1)
+
+
+def profile_of(user):
+    """Профиль со счётчиками; недостающий создаётся по данным из базы.
+
+    Профиля нет у пользователей из loaddata и у созданных импортом до
+    конца загрузки.
+    """
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        profile, _ = Profile.objects.get_or_create(user=user, defaults={
+            'posts_count': Post.objects.filter(author=user).count(),
+            'followers_count': Follow.objects.filter(author=user).count(),
+            'following_count': Follow.objects.filter(user=user).count(),
+        })
+        user.profile = profile
+        return profile
+
+
+def followers_count(author_id):
+    return Profile.objects.filter(pk=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+def counted(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+COUNTERS = (
+    (Group, 'posts_count', counted(Post.objects.all(), 'group')),
+    (Post, 'comments_count', counted(Comment.objects.all(), 'post')),
+    (Profile, 'posts_count', counted(Post.objects.all(), 'author')),
+    (Profile, 'followers_count', counted(Follow.objects.all(), 'author')),
+    (Profile, 'following_count', counted(Follow.objects.all(), 'user')),
+)
+
+
+def recount():
+    """Пересчитывает все счётчики запросами UPDATE по таблицам целиком.
+
+    Возвращает число исправленных записей для каждого счётчика.
+    """
+    Profile.objects.bulk_create(
+        (
+            Profile(user_id=user_id)
+            for user_id in User.objects.filter(
+                profile__isnull=True
+            ).values_list('pk', flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    fixed = {}
+    for model, field, actual in COUNTERS:
+        label = f'{model._meta.model_name}.{field}'
+        fixed[label] = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        ).count()
+        if fixed[label]:
+            model.objects.update(**{field: actual})
+    actual = Post.objects.count()
+    counter, created = SiteCounter.objects.get_or_create(
+        pk=ALL_POSTS, defaults={'value': actual}
+    )
+    fixed['sitecounter.posts'] = int(created or counter.value != actual)
+    if counter.value != actual:
+        SiteCounter.objects.filter(pk=ALL_POSTS).update(value=actual)
+    return fixed
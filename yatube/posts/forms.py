@@ -4,6 +4,17 @@ from .models import Post, Comment
 
 
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # Файлы, отклонённые posts.uploads ещё при чтении запроса.
+        for field, message in self.upload_errors.items():
+            self.add_error(field, message)
+        return cleaned_data
+
     class Meta:
         model = Post
         fields = ["text", "group", "image"]
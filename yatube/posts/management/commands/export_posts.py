@@ -0,0 +1,42 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...bulk import FORMATS, export_records, guess_format, write_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в JSONL или CSV '
+        'потоком, не загружая таблицы в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdout')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--images', metavar='DIR',
+            help='Скопировать файлы картинок постов в каталог',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+        records = export_records(options['images'])
+        start = time.perf_counter()
+        if path == '-':
+            written = write_records(records, sys.stdout, file_format)
+            report = self.stderr
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                written = write_records(records, stream, file_format)
+            report = self.stdout
+        elapsed = time.perf_counter() - start
+        total = sum(written.values())
+        for kind, count in written.items():
+            report.write(f'{kind}: {count}')
+        report.write(self.style.SUCCESS(
+            f'Выгружено записей: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-6):.0f} в секунду)'
+        ))
@@ -0,0 +1,58 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from ...bulk import (
+    BATCH_SIZE,
+    FORMATS,
+    guess_format,
+    import_records,
+    read_records,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из JSONL или CSV '
+        'пачками через bulk_create, затем пересчитывает счётчики, ленты '
+        'и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdin')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--images', metavar='DIR',
+            help='Каталог с файлами картинок постов',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+        start = time.perf_counter()
+        try:
+            if path == '-':
+                imported = self.load(sys.stdin, file_format, options)
+            else:
+                with open(path, encoding='utf-8', newline='') as stream:
+                    imported = self.load(stream, file_format, options)
+        except (IntegrityError, KeyError, ValueError) as error:
+            raise CommandError(f'Загрузка прервана: {error!r}')
+        elapsed = time.perf_counter() - start
+        total = sum(imported.values())
+        for kind, count in imported.items():
+            self.stdout.write(f'{kind}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-6):.0f} в секунду)'
+        ))
+
+    def load(self, stream, file_format, options):
+        return import_records(
+            read_records(stream, file_format),
+            options['images'],
+            options['batch_size'],
+        )
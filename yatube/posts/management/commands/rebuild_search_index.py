@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...search import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит поисковый индекс постов: после массовой загрузки, '
+        'которая обходит сигналы.'
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            rebuild()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковый индекс перестроен за {elapsed:.1f} с'
+        ))
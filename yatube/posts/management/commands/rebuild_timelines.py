@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models import TimelineEntry
+from ...timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново раскладывает посты по лентам подписчиков: после массовой '
+        'загрузки постов или смены TIMELINE_FANOUT_LIMIT.'
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            rebuild()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {TimelineEntry.objects.count()} '
+            f'за {elapsed:.1f} с'
+        ))
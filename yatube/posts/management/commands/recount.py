@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount()
+        for label, count in fixed.items():
+            self.stdout.write(f'{label}: исправлено {count}')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
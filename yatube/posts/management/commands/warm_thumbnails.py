@@ -0,0 +1,34 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core import metrics
+
+from ...models import Post
+from ...thumbnails import generate, generate_in_thread
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры картинок всех постов в несколько потоков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct()
+        start = time.perf_counter()
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as executor:
+                done = sum(1 for _ in executor.map(
+                    generate_in_thread, names.iterator()
+                ))
+        else:
+            done = sum(1 for _ in map(generate, names.iterator()))
+        elapsed = time.perf_counter() - start
+        metrics.REGISTRY.flush(force=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюр обработано: {done} за {elapsed:.1f} с'
+        ))
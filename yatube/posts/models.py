@@ -5,6 +5,33 @@ User = get_user_model()
 
 TEXT_LIMIT = 15
 
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'image',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__slug',
+    'group__title',
+)
+
+
+def save_without_counters(instance, kwargs):
+    """Не даёт save() затереть счётчики, изменённые через F() с момента
+    загрузки объекта: существующая запись сохраняется без них."""
+    if instance._state.adding or kwargs.get('update_fields') is not None:
+        return
+    if kwargs.get('force_insert'):
+        return
+    skipped = {*instance.counter_fields, *instance.get_deferred_fields()}
+    kwargs['update_fields'] = [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.attname not in skipped
+    ]
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -20,6 +47,13 @@ class Group(models.Model):
         max_length=400,
         verbose_name='Описание'
     )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов'
+    )
+
+    counter_fields = ('posts_count',)
 
     class Meta:
         verbose_name_plural = 'Группы'
@@ -28,6 +62,15 @@ class Group(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        save_without_counters(self, kwargs)
+        super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -43,6 +86,7 @@ class Post(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='posts',
+        db_index=False,
         verbose_name='Автор'
     )
     group = models.ForeignKey(
@@ -50,6 +94,7 @@ class Post(models.Model):
         blank=True,
         null=True,
         on_delete=models.SET_NULL,
+        db_index=False,
         related_name='posts',
         verbose_name='Группа',
         help_text='Выберите группу'
@@ -59,19 +104,45 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+
+    counter_fields = ('comments_count',)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date'], name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx',
+            ),
+        ]
         verbose_name_plural = 'Посты'
         verbose_name = 'Пост'
 
     def __str__(self):
         return self.text[:TEXT_LIMIT]
 
+    def save(self, *args, **kwargs):
+        save_without_counters(self, kwargs)
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
-        Post, on_delete=models.CASCADE, related_name="comments"
+        Post,
+        on_delete=models.CASCADE,
+        related_name="comments",
+        db_index=False,
     )
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="comments"
@@ -79,6 +150,13 @@ class Comment(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'pub_date'], name='comment_post_pub_date_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text[:TEXT_LIMIT]
 
@@ -100,3 +178,42 @@ class Follow(models.Model):
 
     def __str__(self):
         return f"{self.user.username} подписан на {self.author.username}"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        db_index=False,
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} в ленте {self.user_id}'
+
+
+class SiteCounter(models.Model):
+    """Счётчики по всему сайту, чтобы не считать их COUNT(*)."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
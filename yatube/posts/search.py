@@ -0,0 +1,166 @@
+"""Полнотекстовый поиск по тексту постов.
+
+В SQLite это виртуальная таблица FTS5 с копией текста под rowid поста:
+сигналы добавляют и удаляют строки индекса при изменении Post.text.
+В PostgreSQL - GIN-индекс по to_tsvector, который СУБД обновляет сама.
+На других базах поиск откатывается к LIKE.
+"""
+import binascii
+import re
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db import connection
+
+from .models import Post
+from .utils import NEXT, PREVIOUS, KeysetPage
+
+FTS_TABLE = 'posts_post_fts'
+PG_CONFIG = 'russian'
+WORD = re.compile(r'\w+')
+
+SQLITE_MATCH = (
+    f'SELECT rowid AS id, rank FROM {FTS_TABLE} '
+    f'WHERE {FTS_TABLE} MATCH %s'
+)
+PG_MATCH = (
+    f"SELECT id, -ts_rank(to_tsvector('{PG_CONFIG}', text), query) AS rank "
+    f"FROM posts_post, plainto_tsquery('{PG_CONFIG}', %s) query "
+    f"WHERE to_tsvector('{PG_CONFIG}', text) @@ query"
+)
+LIKE_MATCH = 'SELECT id, 0.0 AS rank FROM posts_post WHERE text LIKE %s'
+
+
+def uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+def index_post(post):
+    if not uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def unindex_post(post_id):
+    if not uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+
+def rebuild():
+    if not uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+
+
+def fts_query(query):
+    """Запрос FTS5 из слов пользователя: все слова, каждое как префикс."""
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query))
+
+
+def match(query):
+    """SQL (id, rank) подходящих постов; меньший rank - лучше."""
+    if connection.vendor == 'sqlite':
+        return SQLITE_MATCH, [fts_query(query)]
+    if connection.vendor == 'postgresql':
+        return PG_MATCH, [query]
+    return LIKE_MATCH, [f'%{query}%']
+
+
+def has_words(query):
+    return bool(WORD.search(query or ''))
+
+
+def filter_posts(queryset, query):
+    """Оставляет в queryset постов только подходящие под запрос."""
+    sql, params = match(query)
+    return queryset.extra(
+        where=[f'{Post._meta.db_table}.id IN (SELECT id FROM ({sql}) m)'],
+        params=params,
+    )
+
+
+def encode_cursor(row, direction):
+    value = f'{direction}|{row.search_rank!r}|{row.pk}'
+    return urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        value = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, rank, pk = value.decode().split('|')
+        rank, pk = float(rank), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS):
+        return None
+    return direction, rank, pk
+
+
+class SearchPage(KeysetPage):
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return encode_cursor(self.object_list[-1], NEXT)
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return encode_cursor(self.object_list[0], PREVIOUS)
+
+
+class SearchPaginator:
+    """Постраничный вывод результатов по ключу (rank, id) без OFFSET."""
+
+    def __init__(self, query, per_page):
+        self.query = query
+        self.per_page = per_page
+
+    def rows(self, position):
+        sql, params = match(self.query)
+        backwards = position is not None and position[0] == PREVIOUS
+        order = 'DESC' if backwards else 'ASC'
+        where = ''
+        if position is not None:
+            where = f"WHERE (rank, id) {'<' if backwards else '>'} (%s, %s)"
+            params = [*params, *position[1:]]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id, rank FROM ({sql}) matches {where} '
+                f'ORDER BY rank {order}, id {order} LIMIT %s',
+                [*params, self.per_page + 1],
+            )
+            return cursor.fetchall(), backwards
+
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+        rows, backwards = self.rows(position)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            if not rows:
+                return self.get_page()
+            rows.reverse()
+        posts = Post.objects.for_feed().in_bulk([pk for pk, _ in rows])
+        object_list = []
+        for pk, rank in rows:
+            if pk in posts:
+                posts[pk].search_rank = rank
+                object_list.append(posts[pk])
+        if backwards:
+            return SearchPage(object_list, self, True, has_more)
+        return SearchPage(object_list, self, has_more, position is not None)
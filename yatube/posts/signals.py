@@ -0,0 +1,124 @@
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import caching, counters, search, tasks, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+
+LOGIN_FIELDS = frozenset(['last_login'])
+# Посты, удаляемые сейчас вместе с их комментариями.
+deleting_posts = ContextVar('deleting_posts', default=frozenset())
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._previous_group_id, instance._previous_text = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'text'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields, **kwargs):
+    previous_group_slug = None
+    if created:
+        counters.post_added(instance)
+        tasks.fan_out.delay(instance.pk)
+        search.index_post(instance)
+    else:
+        previous_text = getattr(instance, '_previous_text', None)
+        text_saved = update_fields is None or 'text' in update_fields
+        if text_saved and previous_text != instance.text:
+            search.index_post(instance)
+        previous_group_id = getattr(instance, '_previous_group_id', None)
+        if previous_group_id != instance.group_id:
+            counters.post_moved(previous_group_id, instance.group_id)
+            previous_group_slug = Group.objects.filter(
+                pk=previous_group_id
+            ).values_list('slug', flat=True).first()
+    caching.bump_versions(
+        f'card-post:{instance.pk}',
+        *caching.post_versions(instance, previous_group_slug),
+    )
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: thumbnails.schedule(name))
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    deleting_posts.set(deleting_posts.get() | {instance.pk})
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    deleting_posts.set(deleting_posts.get() - {instance.pk})
+    search.unindex_post(instance.pk)
+    counters.post_removed(instance)
+    caching.bump_versions(*caching.post_versions(instance))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    caching.bump_versions(
+        caching.SITE_VERSION, f'card-group:{instance.pk}'
+    )
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == LOGIN_FIELDS:
+        return
+    caching.bump_versions(
+        caching.SITE_VERSION, f'card-author:{instance.pk}'
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_added(instance)
+    # Комментарии видны только на странице поста.
+    caching.bump_versions(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in deleting_posts.get():
+        # Счётчик и страницы удаляемого поста обработает post_deleted.
+        return
+    counters.comment_removed(instance)
+    caching.bump_versions(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    # Меняются счётчики на страницах обоих профилей.
+    caching.bump_versions(
+        f'profile:{instance.author.username}',
+        f'profile:{instance.user.username}',
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.follow_added(instance)
+        timeline.followed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_removed(instance)
+    timeline.unfollowed(instance)
@@ -0,0 +1,18 @@
+from core.queue import task
+
+from . import thumbnails, timeline
+from .models import Post
+
+
+@task(unique=True)
+def generate_thumbnail(name):
+    thumbnails.generate(name)
+
+
+@task()
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'pub_date'
+    ).first()
+    if post is not None:
+        timeline.fan_out(post)
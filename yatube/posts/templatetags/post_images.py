@@ -0,0 +1,28 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(image):
+    if not image:
+        return {}
+    width, height = thumbnails.GEOMETRY.split('x')
+    context = {'width': width, 'height': height}
+    # Миниатюры ставит в очередь сохранение поста (и warm_thumbnails);
+    # пока их нет, шаблон показывает заглушку.
+    thumbnail = thumbnails.cached(image)
+    if thumbnail:
+        srcsets = thumbnails.cached_srcsets(image)
+        context.update(
+            thumbnail=thumbnail,
+            srcset=srcsets.pop('JPEG', ''),
+            sources=[
+                {'type': thumbnails.MIME_TYPES[image_format], 'srcset': srcset}
+                for image_format, srcset in srcsets.items()
+            ],
+            sizes=thumbnails.SIZES,
+        )
+    return context
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from .. import search
+from ..models import Comment, Follow, Group, Post
+from .constants import AUTHOR_USERNAME, GROUP_SLUG, TEST_MEDIA
+
+User = get_user_model()
+
+IMAGE_DATA = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA, TASKS_EAGER=True)
+class ImportExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug=GROUP_SLUG,
+            description="Тестовое описание группы",
+        )
+        cls.post = Post.objects.create(
+            text="Пост с картинкой",
+            author=cls.author,
+            group=cls.group,
+            image=SimpleUploadedFile(
+                name="import.gif", content=IMAGE_DATA, content_type="image/gif"
+            ),
+        )
+        for number in range(5):
+            Post.objects.create(text=f"Пост #{number}", author=cls.author)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text="Комментарий"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEST_MEDIA, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def snapshot(self):
+        return (
+            list(Group.objects.order_by("slug").values_list(
+                "slug", "title", "description"
+            )),
+            list(Post.objects.order_by("pk").values_list(
+                "pk", "text", "pub_date", "author__username", "group__slug",
+                "image", "comments_count",
+            )),
+            list(Comment.objects.values_list(
+                "post_id", "author__username", "text", "pub_date"
+            )),
+            list(Follow.objects.values_list(
+                "user__username", "author__username"
+            )),
+        )
+
+    def test_round_trip(self):
+        expected = self.snapshot()
+        for file_format in ("jsonl", "csv"):
+            with self.subTest(file_format=file_format):
+                path = os.path.join(self.directory, f"data.{file_format}")
+                images = os.path.join(self.directory, file_format)
+                call_command(
+                    "export_posts", path, images=images, stdout=StringIO()
+                )
+                Post.objects.all().delete()
+                Group.objects.all().delete()
+                User.objects.exclude(pk=ImportExportTest.author.pk).delete()
+                default_storage.delete(ImportExportTest.post.image.name)
+                out = StringIO()
+                call_command(
+                    "import_posts", path, images=images, batch_size=2,
+                    stdout=out,
+                )
+                self.assertIn("в секунду", out.getvalue())
+                self.assertEqual(self.snapshot(), expected)
+                self.assertTrue(
+                    default_storage.exists(ImportExportTest.post.image.name)
+                )
+                reader = User.objects.get(username="reader")
+                self.assertEqual(reader.profile.following_count, 1)
+                self.assertEqual(
+                    search.filter_posts(Post.objects.all(), "картинкой").get(),
+                    ImportExportTest.post,
+                )
+
+    def test_invalid_record(self):
+        path = os.path.join(self.directory, "data.jsonl")
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write('{"type": "like"}\n')
+        with self.assertRaisesMessage(CommandError, "like"):
+            call_command("import_posts", path, stdout=StringIO())
+
+    def test_failed_import_keeps_counters_and_search(self):
+        path = os.path.join(self.directory, "data.jsonl")
+        records = (
+            {
+                "type": "post",
+                "id": 100,
+                "text": "Импортированный ёж",
+                "author": AUTHOR_USERNAME,
+                "group": GROUP_SLUG,
+            },
+            {"type": "like"},
+        )
+        with open(path, "w", encoding="utf-8") as stream:
+            for record in records:
+                stream.write(json.dumps(record) + "\n")
+        with self.assertRaises(CommandError):
+            call_command(
+                "import_posts", path, batch_size=1, stdout=StringIO()
+            )
+        post = Post.objects.get(pk=100)
+        self.assertEqual(
+            search.filter_posts(Post.objects.all(), "ёж").get(), post
+        )
+        author = User.objects.get(username=AUTHOR_USERNAME)
+        group = Group.objects.get(slug=GROUP_SLUG)
+        self.assertEqual(author.profile.posts_count, author.posts.count())
+        self.assertEqual(group.posts_count, group.posts.count())
+        new_post = Post.objects.create(text="Новый пост", author=author)
+        self.assertGreater(new_post.pk, post.pk)
@@ -1,19 +1,28 @@
+import os
 import shutil
 
 from http import HTTPStatus
+from io import BytesIO
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 
 from ..models import Group, Post
-from .constants import AUTHOR_USERNAME, GROUP_SLUG, TEST_MEDIA
+from .constants import (
+    AUTHOR_USERNAME,
+    GROUP_SLUG,
+    TEST_MEDIA,
+    URL_CREATE_POST,
+)
 
 User = get_user_model()
 
 
-@override_settings(MEDIA_ROOT=TEST_MEDIA)
+@override_settings(MEDIA_ROOT=TEST_MEDIA, TASKS_EAGER=True)
 class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -84,7 +93,10 @@ class PostFormTests(TestCase):
         self.assertEqual(post.text, form_data["text"])
         self.assertEqual(post.author, self.post_author)
         self.assertEqual(post.group_id, form_data["group"])
-        self.assertEqual(post.image, f'posts/{form_data["image"]}')
+        self.assertRegex(
+            post.image.name,
+            r"^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$",
+        )
 
     def test_authorized_user_edit_post(self):
         post = Post.objects.create(
@@ -146,3 +158,90 @@ class PostFormTests(TestCase):
         self.assertRedirects(
             response, f"/auth/login/?next={PostFormTests.URL_POST_COMMENT}"
         )
+
+
+def make_image(size, image_format="JPEG", orientation=None):
+    image = Image.new("RGB", size, "red")
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, image_format, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEST_MEDIA,
+    TASKS_EAGER=True,
+    UPLOAD_MAX_SIZE=50000,
+    UPLOAD_MAX_PIXELS=10 ** 6,
+    UPLOAD_MAX_DIMENSION=100,
+)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post_author = User.objects.create_user(username=AUTHOR_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEST_MEDIA, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_user = Client()
+        self.authorized_user.force_login(PostImageUploadTests.post_author)
+
+    def upload(self, content, name="image.jpg", client=None):
+        return (client or self.authorized_user).post(
+            URL_CREATE_POST,
+            {
+                "text": "Пост с картинкой",
+                "image": SimpleUploadedFile(name, content, "image/jpeg"),
+            },
+        )
+
+    def test_image_reencoded_without_exif(self):
+        response = self.upload(make_image((300, 200), orientation=6))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (67, 100))
+            self.assertNotIn("exif", image.info)
+
+    def test_rejected_uploads(self):
+        noise = Image.frombytes("RGB", (200, 200), os.urandom(120000))
+        buffer = BytesIO()
+        noise.save(buffer, "BMP")
+        cases = (
+            ("too_large", os.urandom(60000), "Файл слишком большой"),
+            ("too_many_pixels", make_image((2000, 1000), "PNG"), "млн точек"),
+            ("not_image", b"not an image" * 10, "файл повреждён"),
+            ("unsupported", buffer.getvalue()[:40000], "JPEG, PNG, GIF"),
+        )
+        for name, content, message in cases:
+            with self.subTest(name=name):
+                response = self.upload(content)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn(
+                    message, response.context["form"].errors["image"][0]
+                )
+        self.assertFalse(Post.objects.exists())
+
+    def test_anonymous_upload_not_processed(self):
+        with mock.patch("posts.uploads.reencode") as reencode:
+            response = self.upload(
+                make_image((10, 10)), client=Client(enforce_csrf_checks=True)
+            )
+        self.assertRedirects(
+            response,
+            f"{reverse('users:login')}?next={URL_CREATE_POST}",
+        )
+        reencode.assert_not_called()
+
+    def test_csrf_still_checked(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(PostImageUploadTests.post_author)
+        response = self.upload(make_image((10, 10)), client=client)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase
+
+from ..models import Post
+from ..utils import (
+    FeedPaginator,
+    KeysetPaginator,
+    POST_PER_PAGE,
+    get_paginator_helper,
+)
+from .constants import AUTHOR_USERNAME
+
+User = get_user_model()
+
+TOTAL_POSTS = POST_PER_PAGE * 2 + 3
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        Post.objects.bulk_create(
+            Post(text=f"Пост #{number}", author=cls.author)
+            for number in range(TOTAL_POSTS)
+        )
+        cls.expected = list(
+            Post.objects.order_by("-pub_date", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(Post.objects.all(), POST_PER_PAGE)
+
+    def test_pages_cover_feed_in_order(self):
+        seen = []
+        page = self.paginator.get_page()
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            page = self.paginator.get_page(page.next_cursor)
+        self.assertEqual(seen, KeysetPaginatorTest.expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        back = self.paginator.get_page(second.previous_cursor)
+        self.assertEqual(
+            [post.pk for post in back], [post.pk for post in first]
+        )
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_page_is_one_query_without_count(self):
+        first = self.paginator.get_page()
+        with self.assertNumQueries(1):
+            page = self.paginator.get_page(first.next_cursor)
+        self.assertEqual(len(page), POST_PER_PAGE)
+
+    def test_invalid_cursor_returns_first_page(self):
+        for cursor in ("garbage", "bnwxfHg", "!!!"):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(
+                    page[0].pk, KeysetPaginatorTest.expected[0]
+                )
+
+    def test_helper_renders_cursor_links(self):
+        first = self.paginator.get_page()
+        request = RequestFactory().get("/", {"cursor": first.next_cursor})
+        page = get_paginator_helper(request, Post.objects.all(), keyset=True)
+        html = render_to_string(
+            "posts/includes/paginator.html", {"page_obj": page}
+        )
+        self.assertIn(f"?cursor={page.next_cursor}", html)
+        self.assertIn(f"?cursor={page.previous_cursor}", html)
+        self.assertNotIn("?page=", html)
+
+
+class FeedPaginatorTest(TestCase):
+    def setUp(self):
+        self.paginator = FeedPaginator(
+            range(100 * POST_PER_PAGE), POST_PER_PAGE, counter=lambda: 1000
+        )
+
+    def test_count_comes_from_counter(self):
+        self.assertEqual(self.paginator.count, 1000)
+        self.assertEqual(self.paginator.num_pages, 100)
+
+    def test_elided_page_range(self):
+        ellipsis = FeedPaginator.ELLIPSIS
+        cases = (
+            (1, [1, 2, 3, ellipsis, 100]),
+            (4, [1, 2, 3, 4, 5, 6, ellipsis, 100]),
+            (5, [1, 2, 3, 4, 5, 6, 7, ellipsis, 100]),
+            (6, [1, ellipsis, 4, 5, 6, 7, 8, ellipsis, 100]),
+            (50, [1, ellipsis, 48, 49, 50, 51, 52, ellipsis, 100]),
+            (96, [1, ellipsis, 94, 95, 96, 97, 98, 99, 100]),
+            (97, [1, ellipsis, 95, 96, 97, 98, 99, 100]),
+            (100, [1, ellipsis, 98, 99, 100]),
+        )
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    self.paginator.get_page(number).elided_page_range,
+                    expected,
+                )
+
+    def test_template_renders_window_only(self):
+        html = render_to_string(
+            "posts/includes/paginator.html",
+            {"page_obj": self.paginator.get_page(50)},
+        )
+        self.assertIn("?page=52", html)
+        self.assertNotIn("?page=53\"", html)
+        self.assertIn(FeedPaginator.ELLIPSIS, html)
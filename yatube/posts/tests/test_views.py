@@ -1,16 +1,35 @@
 import shutil
+import time
+from io import StringIO
 
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
 
 from random import randint
-
-from ..models import Group, Post, Follow
-from ..utils import POST_PER_PAGE
+from unittest import mock
+
+from core import queue
+from users.models import Profile
+
+from .. import caching, counters, thumbnails, timeline
+from ..models import (
+    Comment,
+    Follow,
+    Group,
+    Post,
+    SiteCounter,
+    TimelineEntry,
+)
+from ..utils import COMMENTS_PER_PAGE, POST_PER_PAGE
 from .constants import (
     AUTHOR_USERNAME,
     GROUP_SLUG,
@@ -28,7 +47,7 @@ second_page = randint(1, POST_PER_PAGE)
 total_posts = POST_PER_PAGE + second_page
 
 
-@override_settings(MEDIA_ROOT=TEST_MEDIA)
+@override_settings(MEDIA_ROOT=TEST_MEDIA, TASKS_EAGER=True)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -99,6 +118,38 @@ class PostPagesTests(TestCase):
         response = self.author_client.get(PostPagesTests.POST_URL)
         self.check_post_info(response.context["post"])
 
+    def test_pages_show_thumbnail(self):
+        thumbnails.generate(PostPagesTests.post.image.name)
+        response = self.author_client.get(URL_INDEX)
+        thumbnail = thumbnails.cached(PostPagesTests.post.image)
+        self.assertIsNotNone(thumbnail)
+        self.assertContains(response, f'src="{thumbnail.url}"')
+        srcsets = thumbnails.cached_srcsets(PostPagesTests.post.image)
+        self.assertEqual(set(srcsets), set(thumbnails.FORMATS))
+        for width in thumbnails.WIDTHS:
+            with self.subTest(width=width):
+                self.assertIn(f' {width}w', srcsets['JPEG'])
+        self.assertContains(response, f'srcset="{srcsets["JPEG"]}"')
+
+    def test_pages_show_placeholder_while_thumbnail_pending(self):
+        with mock.patch.object(thumbnails, "schedule") as schedule:
+            response = self.author_client.get(URL_INDEX)
+        schedule.assert_not_called()
+        self.assertContains(response, "aspect-ratio: 960 / 339")
+        self.assertNotContains(response, 'srcset="')
+
+    def test_warm_thumbnails_command(self):
+        self.assertIsNone(thumbnails.cached(PostPagesTests.post.image))
+        call_command("warm_thumbnails", workers=1, stdout=StringIO())
+        self.assertIsNotNone(thumbnails.cached(PostPagesTests.post.image))
+
+    def test_thumbnail_generation_invalidates_pages(self):
+        etag = self.author_client.get(URL_INDEX)["ETag"]
+        thumbnails.generate(PostPagesTests.post.image.name)
+        response = self.author_client.get(URL_INDEX, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'srcset="')
+
     def test_create_edit_pages_show_correct_context(self):
         adresses = (URL_CREATE_POST, PostPagesTests.POST_EDIT_URL)
         for adress in adresses:
@@ -131,6 +182,7 @@ class PaginatorViewsTest(TestCase):
             for count in range(total_posts)
         ]
         Post.objects.bulk_create(objs)
+        counters.recount()
 
     def setUp(self):
         self.unauthorized_client = Client()
@@ -166,28 +218,374 @@ class CacheTest(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.post_author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug=GROUP_SLUG,
+            description="Тестовое описание группы",
+        )
         cls.test_post = Post.objects.create(
             author=cls.post_author,
-            text="Текстовый пост"
+            text="Текстовый пост",
+            group=cls.group,
         )
 
     def setUp(self):
+        self.guest_client = Client()
         self.author_client = Client()
         self.author_client.force_login(CacheTest.post_author)
+        cache.clear()
 
     def test_cache(self):
-        post_cache = Post.objects.create(
-            text="Тестовый пост 2",
-            author=CacheTest.post_author
-        )
-        response_before = self.author_client.get(URL_INDEX)
-        post_cache.delete()
-        response_after = self.author_client.get(URL_INDEX)
-        self.assertEqual(response_before.content, response_after.content)
+        for url in (URL_INDEX, URL_GROUP, URL_AUTHOR_PROFILE):
+            with self.subTest(url=url):
+                response_before = self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    response_after = self.guest_client.get(url)
+                self.assertEqual(
+                    response_before.content, response_after.content
+                )
+
+    def test_cache_invalidated_on_post_changes(self):
+        for url in (URL_INDEX, URL_GROUP, URL_AUTHOR_PROFILE):
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                post_cache = Post.objects.create(
+                    text="Тестовый пост 2",
+                    author=CacheTest.post_author,
+                    group=CacheTest.group,
+                )
+                response = self.guest_client.get(url)
+                self.assertContains(response, post_cache.text)
+                post_cache.delete()
+                response = self.guest_client.get(url)
+                self.assertNotContains(response, post_cache.text)
+
+    def test_cache_is_per_user(self):
+        self.guest_client.get(URL_INDEX)
+        response = self.author_client.get(URL_INDEX)
+        self.assertContains(response, AUTHOR_USERNAME)
+
+    def test_profile_cache_invalidated_on_follow(self):
+        follower = User.objects.create_user(username="follower")
+        follower_client = Client()
+        follower_client.force_login(follower)
+        self.assertContains(
+            follower_client.get(URL_AUTHOR_PROFILE), "Подписаться"
+        )
+        follower_client.get(
+            reverse("posts:profile_follow", args=[AUTHOR_USERNAME])
+        )
+        self.assertContains(
+            follower_client.get(URL_AUTHOR_PROFILE), "Отписаться"
+        )
+
+    def test_follower_profile_cache_invalidated_on_follow(self):
+        follower = User.objects.create_user(username="follower")
+        follower_client = Client()
+        follower_client.force_login(follower)
+        follower_profile = reverse("posts:profile", args=[follower.username])
+        self.assertContains(
+            follower_client.get(follower_profile), "подписок: 0"
+        )
+        follower_client.get(
+            reverse("posts:profile_follow", args=[AUTHOR_USERNAME])
+        )
+        self.assertContains(
+            follower_client.get(follower_profile), "подписок: 1"
+        )
+
+    def test_version_keys_expire(self):
+        response = self.guest_client.get(
+            reverse("posts:group_list", args=["missing"])
+        )
+        self.assertEqual(response.status_code, 404)
+        key = caching.version_key("group:missing")
+        self.assertIsNotNone(cache.get(key))
+        expired = time.time() + settings.PAGE_CACHE_TIMEOUT + 1
+        with mock.patch("time.time", return_value=expired):
+            self.assertIsNone(cache.get(key))
+
+    def test_card_fragment_reused_between_pages(self):
+        response = self.guest_client.get(URL_INDEX)
+        post = response.context["page_obj"][0]
+        key = make_template_fragment_key(
+            "post_card", [post.pk, post.card_version, True, True]
+        )
+        cache.set(key, "Карточка из кэша")
+        Post.objects.create(text="Новый пост", author=CacheTest.post_author)
+        self.assertContains(
+            self.guest_client.get(URL_INDEX), "Карточка из кэша"
+        )
+
+    def test_card_fragment_invalidated(self):
+        self.guest_client.get(URL_INDEX)
+        changes = (
+            (Post.objects.get(), "text", "Исправленный текст"),
+            (User.objects.get(), "first_name", "Лев"),
+            (Group.objects.get(), "slug", "new_slug"),
+        )
+        for instance, field, value in changes:
+            with self.subTest(field=field):
+                setattr(instance, field, value)
+                instance.save()
+                self.assertContains(self.guest_client.get(URL_INDEX), value)
+
+    def test_waiting_worker_reuses_page_from_lock_holder(self):
+        key = "posts:page:test"
+        cache.add(f"{key}:lock", 1)
+
+        def render():
+            raise AssertionError("Страница не должна рендериться повторно")
+
+        with mock.patch.object(
+            caching.time, "sleep", lambda _: cache.set(key, "страница")
+        ):
+            self.assertEqual(caching.get_or_render(key, render), "страница")
+
+
+class CommentsPageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.post = Post.objects.create(text="Пост", author=cls.author)
+        cls.POST_URL = reverse("posts:post_detail", args=[cls.post.pk])
+        cls.COMMENTS_URL = reverse("posts:post_comments", args=[cls.post.pk])
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def create_comments(self, count):
+        Comment.objects.bulk_create(
+            Comment(
+                post=CommentsPageTest.post,
+                author=CommentsPageTest.author,
+                text=f"Комментарий #{number}",
+            )
+            for number in range(count)
+        )
+
+    def test_post_detail_queries_do_not_grow_with_comments(self):
+        for count in (1, COMMENTS_PER_PAGE * 3):
+            Comment.objects.all().delete()
+            self.create_comments(count)
+            with self.subTest(comments=count):
+                with self.assertNumQueries(3):
+                    response = self.guest_client.get(
+                        CommentsPageTest.POST_URL
+                    )
+                self.assertEqual(
+                    len(response.context["comments"]),
+                    min(count, COMMENTS_PER_PAGE),
+                )
+
+    def test_comments_fragment_returns_next_page(self):
+        self.create_comments(COMMENTS_PER_PAGE + 5)
+        response = self.guest_client.get(CommentsPageTest.POST_URL)
+        first_page = response.context["comments"]
+        self.assertContains(response, CommentsPageTest.COMMENTS_URL)
+        response = self.guest_client.get(
+            CommentsPageTest.COMMENTS_URL,
+            {"cursor": first_page.next_cursor},
+        )
+        self.assertTemplateNotUsed(response, "base.html")
+        second_page = response.context["comments"]
+        self.assertEqual(len(second_page), 5)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(
+            {comment.pk for comment in first_page}
+            & {comment.pk for comment in second_page}
+        )
+
+    def test_comments_fragment_for_missing_post(self):
+        response = self.guest_client.get(
+            reverse("posts:post_comments", args=[0])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug=GROUP_SLUG,
+            description="Тестовое описание группы",
+        )
+        cls.post = Post.objects.create(
+            text="Пост", author=cls.author, group=cls.group
+        )
+        cls.POST_URL = reverse("posts:post_detail", args=[cls.post.pk])
+        cls.URLS = (URL_INDEX, URL_GROUP, URL_AUTHOR_PROFILE, cls.POST_URL)
+
+    def setUp(self):
         cache.clear()
-        response_after_clear = self.author_client.get(URL_INDEX)
-        self.assertNotEqual(
-            response_after_clear.content, response_after.content
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(ConditionalGetTest.author)
+
+    def test_anonymous_pages_are_public(self):
+        url_queries = (
+            (URL_INDEX, 0),
+            (URL_GROUP, 0),
+            (URL_AUTHOR_PROFILE, 0),
+            (ConditionalGetTest.POST_URL, 1),
+        )
+        for url, queries in url_queries:
+            response = self.guest_client.get(url)
+            with self.subTest(url=url):
+                self.assertIn("public", response["Cache-Control"])
+                self.assertIn(
+                    f"max-age={settings.FEED_CACHE_MAX_AGE}",
+                    response["Cache-Control"],
+                )
+                self.assertIn("Cookie", response["Vary"])
+                with self.assertNumQueries(queries):
+                    not_modified = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response["ETag"]
+                    )
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertIn("public", not_modified["Cache-Control"])
+                not_modified = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+                )
+                self.assertEqual(not_modified.status_code, 304)
+
+    def test_user_pages_are_private(self):
+        anonymous_etag = self.guest_client.get(URL_INDEX)["ETag"]
+        response = self.author_client.get(URL_INDEX)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotIn("Last-Modified", response)
+        self.assertNotEqual(response["ETag"], anonymous_etag)
+        not_modified = self.author_client.get(
+            URL_INDEX, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(not_modified.status_code, 304)
+        response = self.author_client.get(
+            URL_INDEX, HTTP_IF_NONE_MATCH=anonymous_etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_invalidates_etag(self):
+        url = ConditionalGetTest.POST_URL
+        etag = self.author_client.get(url)["ETag"]
+        self.author_client.logout()
+        self.author_client.force_login(ConditionalGetTest.author)
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "csrfmiddlewaretoken")
+
+    def test_changes_invalidate_etag(self):
+        changes = (
+            (URL_INDEX, lambda: Post.objects.create(
+                text="Новый пост", author=ConditionalGetTest.author
+            )),
+            (ConditionalGetTest.POST_URL, lambda: Comment.objects.create(
+                post=ConditionalGetTest.post,
+                author=ConditionalGetTest.author,
+                text="Комментарий",
+            )),
+            (ConditionalGetTest.POST_URL, lambda: Post.objects.create(
+                text="Ещё пост", author=ConditionalGetTest.author
+            )),
+        )
+        for url, change in changes:
+            etag = self.guest_client.get(url)["ETag"]
+            change()
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.post = Post.objects.create(
+            text="Ёлка стоит в лесу", author=cls.author
+        )
+        cls.URL_SEARCH = reverse("posts:post_search")
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        response = self.guest_client.get(
+            SearchTest.URL_SEARCH, {"q": query, **params}
+        )
+        return response.context["page_obj"]
+
+    def texts(self, query):
+        return [post.text for post in self.search(query)]
+
+    def test_search_finds_words_and_prefixes(self):
+        for query in ("лесу", "ЛЕС", "ёлка стоит", "ёлк"):
+            with self.subTest(query=query):
+                self.assertEqual(self.texts(query), [SearchTest.post.text])
+        for query in ("стоит дуб", "лесник"):
+            with self.subTest(query=query):
+                self.assertEqual(self.texts(query), [])
+        response = self.guest_client.get(SearchTest.URL_SEARCH, {"q": "!"})
+        self.assertIsNone(response.context["page_obj"])
+
+    def test_results_ranked_by_relevance(self):
+        Post.objects.create(
+            text="Лес, лес и ещё раз лес", author=SearchTest.author
+        )
+        self.assertEqual(
+            self.texts("лес"), ["Лес, лес и ещё раз лес", "Ёлка стоит в лесу"]
+        )
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.create(
+            text="Старый текст", author=SearchTest.author
+        )
+        post.text = "Новый текст"
+        post.save()
+        self.assertEqual(self.texts("старый"), [])
+        self.assertEqual(self.texts("новый"), ["Новый текст"])
+        Post.objects.filter(pk=post.pk).delete()
+        self.assertEqual(self.texts("текст"), [])
+
+    def test_search_keyset_pages(self):
+        for number in range(POST_PER_PAGE + 2):
+            Post.objects.create(
+                text=f"Пост про лес #{number}", author=SearchTest.author
+            )
+        first = self.search("лес")
+        second = self.search("лес", cursor=first.next_cursor)
+        back = self.search("лес", cursor=second.previous_cursor)
+        self.assertEqual(len(first), POST_PER_PAGE)
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        self.assertFalse(
+            {post.pk for post in first} & {post.pk for post in second}
+        )
+        self.assertEqual(
+            [post.pk for post in back], [post.pk for post in first]
+        )
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass"
+        )
+        self.guest_client.force_login(admin)
+        other = Post.objects.create(
+            text="Ещё одна прогулка по лесу", author=SearchTest.author
+        )
+        response = self.guest_client.get(
+            reverse("admin:posts_post_changelist"), {"q": "ЛЕСУ"}
+        )
+        self.assertEqual(
+            list(response.context["cl"].result_list),
+            [other, SearchTest.post],
         )
 
 
@@ -251,3 +649,289 @@ class FollowTest(TestCase):
         )
         unfollow_count_before = len(response_unfollow.context["page_obj"])
         self.assertEqual(unfollow_count_before, 0)
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.follower = User.objects.create_user(username="follower")
+        cls.other_follower = User.objects.create_user(username="other")
+        cls.post = Post.objects.create(
+            text="Старый пост", author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(TimelineTest.follower)
+
+    def entries(self, user):
+        return list(
+            TimelineEntry.objects.filter(user=user).values_list(
+                "post__text", flat=True
+            )
+        )
+
+    def feed(self):
+        response = self.follower_client.get(reverse("posts:follow_index"))
+        return [post.text for post in response.context["page_obj"]]
+
+    def test_timeline_follows_posts_and_subscriptions(self):
+        self.follower_client.get(
+            reverse("posts:profile_follow", args=[AUTHOR_USERNAME])
+        )
+        self.assertEqual(self.entries(TimelineTest.follower), ["Старый пост"])
+        Post.objects.create(text="Новый пост", author=TimelineTest.author)
+        self.assertEqual(self.feed(), ["Новый пост", "Старый пост"])
+        self.follower_client.get(
+            reverse("posts:profile_unfollow", args=[AUTHOR_USERNAME])
+        )
+        self.assertEqual(self.entries(TimelineTest.follower), [])
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_posts_pulled_on_read(self):
+        for user in (TimelineTest.follower, TimelineTest.other_follower):
+            Follow.objects.create(user=user, author=TimelineTest.author)
+        Post.objects.create(text="Новый пост", author=TimelineTest.author)
+        self.assertEqual(self.entries(TimelineTest.follower), ["Старый пост"])
+        self.assertEqual(self.feed(), ["Новый пост", "Старый пост"])
+        Follow.objects.filter(user=TimelineTest.other_follower).delete()
+        self.assertCountEqual(
+            self.entries(TimelineTest.follower),
+            ["Новый пост", "Старый пост"],
+        )
+        self.assertEqual(self.feed(), ["Новый пост", "Старый пост"])
+
+    @override_settings(TASKS_EAGER=False)
+    def test_fan_out_runs_in_background(self):
+        Follow.objects.create(
+            user=TimelineTest.follower, author=TimelineTest.author
+        )
+        Post.objects.create(text="Новый пост", author=TimelineTest.author)
+        self.assertEqual(self.entries(TimelineTest.follower), ["Старый пост"])
+        queue.run_pending()
+        self.assertCountEqual(
+            self.entries(TimelineTest.follower),
+            ["Новый пост", "Старый пост"],
+        )
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.follower = User.objects.create_user(username="follower")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug=GROUP_SLUG,
+            description="Тестовое описание группы",
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        cls.URL_FOLLOW = reverse("posts:follow_index")
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.follower_client = Client()
+        self.follower_client.force_login(FeedQueriesTest.follower)
+        cache.clear()
+
+    def create_posts(self, count):
+        Post.objects.bulk_create(
+            Post(
+                text=f"Пост #{number}",
+                author=FeedQueriesTest.author,
+                group=FeedQueriesTest.group,
+            )
+            for number in range(count)
+        )
+        counters.recount()
+        timeline.rebuild()
+
+    def test_feed_queries_do_not_grow_with_page(self):
+        url_queries = (
+            (URL_INDEX, self.guest_client, 2),
+            (URL_GROUP, self.guest_client, 2),
+            (URL_AUTHOR_PROFILE, self.guest_client, 2),
+            (self.URL_FOLLOW, self.follower_client, 4),
+        )
+        for count in (1, POST_PER_PAGE):
+            Post.objects.all().delete()
+            self.create_posts(count)
+            for url, client, queries in url_queries:
+                cache.clear()
+                with self.subTest(url=url, posts=count):
+                    with self.assertNumQueries(queries):
+                        client.get(url)
+
+    def test_feed_counts_read_from_counter_columns(self):
+        self.create_posts(POST_PER_PAGE + 1)
+        url_queries = (
+            (URL_GROUP, self.guest_client, 2),
+            (URL_AUTHOR_PROFILE, self.guest_client, 2),
+            (self.URL_FOLLOW, self.follower_client, 4),
+        )
+        for url, client, queries in url_queries:
+            client.get(url)
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = client.get(url + "?page=2")
+                self.assertEqual(
+                    response.context["page_obj"].paginator.count,
+                    POST_PER_PAGE + 1,
+                )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug=GROUP_SLUG,
+            description="Тестовое описание группы",
+        )
+        cls.other_group = Group.objects.create(
+            title="Другая группа",
+            slug="other_slug",
+            description="Тестовое описание группы",
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(CountersTest.author)
+
+    def get_counts(self):
+        CountersTest.author.profile.refresh_from_db()
+        CountersTest.group.refresh_from_db()
+        CountersTest.other_group.refresh_from_db()
+        return (
+            counters.all_posts_count(),
+            CountersTest.author.profile.posts_count,
+            CountersTest.group.posts_count,
+            CountersTest.other_group.posts_count,
+        )
+
+    def test_counters_follow_create_edit_delete(self):
+        self.assertEqual(self.get_counts(), (0, 0, 0, 0))
+        self.author_client.post(
+            URL_CREATE_POST,
+            data={"text": "Новый пост", "group": CountersTest.group.pk},
+        )
+        self.assertEqual(self.get_counts(), (1, 1, 1, 0))
+        post = Post.objects.get()
+        self.author_client.post(
+            reverse("posts:post_edit", args=[post.pk]),
+            data={"text": "Новый пост", "group": CountersTest.other_group.pk},
+        )
+        self.assertEqual(self.get_counts(), (1, 1, 0, 1))
+        Post.objects.get().delete()
+        self.assertEqual(self.get_counts(), (0, 0, 0, 0))
+
+    def test_comment_and_follow_counters(self):
+        post = Post.objects.create(text="Пост", author=CountersTest.author)
+        reader = User.objects.create_user(username="reader")
+        reader_client = Client()
+        reader_client.force_login(reader)
+        reader_client.post(
+            reverse("posts:add_comment", args=[post.pk]),
+            data={"text": "Комментарий"},
+        )
+        reader_client.get(
+            reverse("posts:profile_follow", args=[AUTHOR_USERNAME])
+        )
+        post.refresh_from_db()
+        reader.profile.refresh_from_db()
+        CountersTest.author.profile.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(reader.profile.following_count, 1)
+        self.assertEqual(CountersTest.author.profile.followers_count, 1)
+        reader_client.get(
+            reverse("posts:profile_unfollow", args=[AUTHOR_USERNAME])
+        )
+        post.comments.all().delete()
+        post.refresh_from_db()
+        CountersTest.author.profile.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(CountersTest.author.profile.followers_count, 0)
+
+    def test_post_delete_queries_do_not_grow_with_comments(self):
+        queries = []
+        for comments in (1, 50):
+            post = Post.objects.create(text="Пост", author=CountersTest.author)
+            Comment.objects.bulk_create(
+                Comment(post=post, author=CountersTest.author, text="Текст")
+                for _ in range(comments)
+            )
+            with CaptureQueriesContext(connection) as context:
+                post.delete()
+            queries.append(len(context))
+        self.assertEqual(queries[0], queries[1])
+        post = Post.objects.create(text="Пост", author=CountersTest.author)
+        Comment.objects.create(
+            post=post, author=CountersTest.author, text="Комментарий"
+        )
+        Comment.objects.get().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_all_posts_count_is_shared(self):
+        for number in range(3):
+            Post.objects.create(
+                text=f"Пост {number}", author=CountersTest.author
+            )
+        cache.clear()
+        self.assertEqual(counters.all_posts_count(), 3)
+        SiteCounter.objects.all().delete()
+        self.assertEqual(counters.all_posts_count(), 3)
+        Post.objects.create(text="Ещё пост", author=CountersTest.author)
+        self.assertEqual(counters.all_posts_count(), 4)
+
+    def test_pages_work_without_profile(self):
+        author = User.objects.create_user(username="imported")
+        post = Post.objects.create(text="Импортированный пост", author=author)
+        Follow.objects.create(user=CountersTest.author, author=author)
+        Profile.objects.filter(user=author).delete()
+        response = self.author_client.get(
+            reverse("posts:profile", args=[author.username])
+        )
+        self.assertContains(response, post.text)
+        self.assertContains(response, "Подписчиков: 1, подписок: 0")
+        self.assertEqual(response.context["count_posts"], 1)
+        self.assertEqual(Profile.objects.get(user=author).posts_count, 1)
+        response = self.author_client.get(
+            reverse("posts:post_detail", args=[post.pk])
+        )
+        self.assertEqual(response.context["count_posts"], 1)
+
+    def test_edit_does_not_overwrite_counters(self):
+        post = Post.objects.create(text="Пост", author=CountersTest.author)
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(
+            post=post, author=CountersTest.author, text="Комментарий"
+        )
+        stale.text = "Исправленный пост"
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_recount_repairs_drift(self):
+        Post.objects.bulk_create(
+            Post(text="Пост", author=CountersTest.author,
+                 group=CountersTest.group)
+            for _ in range(3)
+        )
+        Group.objects.filter(pk=CountersTest.other_group.pk).update(
+            posts_count=5
+        )
+        out = StringIO()
+        call_command("recount", stdout=out)
+        self.assertIn("group.posts_count: исправлено 2", out.getvalue())
+        self.assertIn("profile.posts_count: исправлено 1", out.getvalue())
+        self.assertIn("sitecounter.posts: исправлено 1", out.getvalue())
+        self.assertEqual(self.get_counts(), (3, 3, 3, 0))
@@ -0,0 +1,155 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import metrics
+
+from . import caching
+from .models import Post
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True, 'format': 'JPEG'}
+WIDTHS = (320, 640, 960)
+FORMATS = ('WEBP', 'JPEG') if features.check('webp') else ('JPEG',)
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+def rendition_geometry(width):
+    full_width, full_height = map(int, GEOMETRY.split('x'))
+    return f'{width}x{round(width * full_height / full_width)}'
+
+
+RENDITIONS = [
+    (image_format, width, rendition_geometry(width))
+    for image_format in FORMATS
+    for width in WIDTHS
+]
+
+logger = logging.getLogger(__name__)
+
+
+class CachedThumbnailBackend(ThumbnailBackend):
+    def get_options(self, source, options):
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        """Готовая миниатюра из KV store или None, без чтения картинки."""
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self.get_options(source, options)
+        )
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+    def create_renditions(self, file_, renditions):
+        """Создаёт все размеры и форматы, прочитав исходник один раз."""
+        source = ImageFile(file_)
+        source_image = default.engine.get_image(source)
+        created = 0
+        try:
+            source.set_size(default.engine.get_image_size(source_image))
+            default.kvstore.get_or_set(source)
+            for geometry_string, options in renditions:
+                options = self.get_options(source, options)
+                thumbnail = ImageFile(
+                    self._get_thumbnail_filename(
+                        source, geometry_string, options
+                    ),
+                    default.storage,
+                )
+                if default.kvstore.get(thumbnail):
+                    continue
+                if (thumbnail_settings.THUMBNAIL_FORCE_OVERWRITE
+                        or not thumbnail.exists()):
+                    options['image_info'] = default.engine.get_image_info(
+                        source_image
+                    )
+                    self._create_thumbnail(
+                        source_image, geometry_string, options, thumbnail
+                    )
+                default.kvstore.set(thumbnail, source)
+                created += 1
+        finally:
+            default.engine.cleanup(source_image)
+        return created
+
+
+backend = CachedThumbnailBackend()
+
+
+def cached(image):
+    return backend.get_cached_thumbnail(image, GEOMETRY, **OPTIONS)
+
+
+def cached_srcsets(image):
+    """srcset по форматам для готовых размеров картинки."""
+    srcsets = {}
+    for image_format, width, geometry_string in RENDITIONS:
+        thumbnail = backend.get_cached_thumbnail(
+            image, geometry_string, **{**OPTIONS, 'format': image_format}
+        )
+        if thumbnail:
+            srcsets.setdefault(image_format, []).append(
+                f'{thumbnail.url} {width}w'
+            )
+    return {
+        image_format: ', '.join(srcset)
+        for image_format, srcset in srcsets.items()
+    }
+
+
+def generate(name):
+    # Без явного хранилища sorl искал бы исходник в THUMBNAIL_STORAGE.
+    image = ImageFile(name, default_storage)
+    try:
+        start = time.perf_counter()
+        created = backend.create_renditions(image, [
+            (geometry_string, {**OPTIONS, 'format': image_format})
+            for image_format, _, geometry_string in RENDITIONS
+        ])
+        if created:
+            metrics.THUMBNAIL_DURATION.observe(time.perf_counter() - start)
+            # Страницы с заглушкой вместо картинки перестают быть свежими.
+            for post in Post.objects.filter(image=name).select_related(
+                'author', 'group'
+            ):
+                caching.bump_versions(*caching.post_versions(post))
+        return backend.get_cached_thumbnail(image, GEOMETRY, **OPTIONS)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+
+
+def generate_in_thread(name):
+    try:
+        generate(name)
+    finally:
+        connections.close_all()
+
+
+def schedule(name):
+    """Ставит создание миниатюр в очередь задач; в режиме TASKS_EAGER
+    они создаются сразу и возвращается готовая миниатюра."""
+    from .tasks import generate_thumbnail
+
+    if settings.TASKS_EAGER:
+        return generate(name)
+    generate_thumbnail.delay(name)
+    return None
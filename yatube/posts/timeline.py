@@ -0,0 +1,118 @@
+"""Лента подписок, разложенная по подписчикам при записи.
+
+Новый пост копируется в TimelineEntry каждого подписчика автора, поэтому
+страница /follow/ читается одним диапазоном индекса (user, -pub_date).
+Посты авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT, не
+копируются: такие авторы подмешиваются в ленту при чтении.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q
+
+from . import counters
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def is_fanned_out(followers):
+    return followers <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    if not is_fanned_out(counters.followers_count(post.author_id)):
+        return
+    user_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in user_ids.iterator()
+    )
+
+
+def backfill(user_ids, author_id):
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+        for user_id in user_ids
+    )
+
+
+def followed(follow):
+    followers = counters.followers_count(follow.author_id)
+    if is_fanned_out(followers):
+        backfill([follow.user_id], follow.author_id)
+
+
+def unfollowed(follow):
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id
+    ).delete()
+    followers = counters.followers_count(follow.author_id)
+    if followers == settings.TIMELINE_FANOUT_LIMIT:
+        # Автор только что вернулся под порог: его посты, пропущенные при
+        # записи, раскладываются оставшимся подписчикам.
+        backfill(
+            list(Follow.objects.filter(
+                author_id=follow.author_id
+            ).values_list('user_id', flat=True)),
+            follow.author_id,
+        )
+
+
+def rebuild():
+    """Раскладывает заново все ленты одним INSERT ... SELECT: построчный
+    backfill для миллионов записей упирается в Python."""
+    TimelineEntry.objects.all().delete()
+    fanned_out, params = Follow.objects.values('author_id').annotate(
+        followers=Count('pk')
+    ).filter(
+        followers__lte=settings.TIMELINE_FANOUT_LIMIT
+    ).values('author_id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, post_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            'ON post.author_id = follow.author_id '
+            f'WHERE follow.author_id IN ({fanned_out})',
+            params,
+        )
+
+
+def feed(user, followers):
+    """Посты ленты подписок user.
+
+    followers - число подписчиков каждого автора, на которого подписан user.
+    """
+    pulled = [
+        author_id
+        for author_id, count in followers.items()
+        if not is_fanned_out(count)
+    ]
+    posts = Post.objects.for_feed()
+    if not pulled:
+        return posts.filter(timeline_entries__user=user).order_by(
+            '-timeline_entries__pub_date'
+        )
+    return posts.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=pulled)
+    )
@@ -0,0 +1,154 @@
+"""Приём картинок к постам потоком, с ограничениями размера.
+
+Обработчик пишет файл кусками во временный файл, поэтому память на одну
+загрузку не зависит от размера файла. Слишком большой запрос отсекается
+по Content-Length ещё до чтения тела, а картинка с недопустимым форматом
+или размерами - по заголовку, до полного декодирования. Принятая
+картинка перекодируется: EXIF удаляется (поворот из него применяется),
+стороны ограничиваются UPLOAD_MAX_DIMENSION. Анимация не сохраняется:
+остаётся первый кадр.
+"""
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import (
+    SkipFile,
+    TemporaryFileUploadHandler,
+)
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps
+
+FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 85},
+}
+KEPT_INFO = ('icc_profile', 'transparency')
+UNSUPPORTED = 'Загрузите картинку в формате JPEG, PNG, GIF или WEBP.'
+# Заголовок JPEG может идти после сегментов EXIF по 64 КиБ.
+HEADER_LIMIT = 512 * 1024
+
+
+def read_header(data):
+    """Формат и размеры картинки по началу файла или None."""
+    try:
+        with Image.open(BytesIO(data)) as image:
+            return image.format, image.size
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def reencode(upload):
+    """Копия загрузки без метаданных и не больше UPLOAD_MAX_DIMENSION."""
+    limit = settings.UPLOAD_MAX_DIMENSION
+    with Image.open(upload) as source:
+        image_format = source.format
+        # JPEG декодируется сразу в уменьшенном масштабе.
+        source.draft(source.mode, (limit, limit))
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((limit, limit))
+        image.info = {
+            key: source.info[key] for key in KEPT_INFO if key in source.info
+        }
+        result = TemporaryUploadedFile(
+            upload.name,
+            upload.content_type,
+            0,
+            upload.charset,
+            upload.content_type_extra,
+        )
+        image.save(result, image_format, **SAVE_OPTIONS.get(image_format, {}))
+    result.size = result.tell()
+    result.seek(0)
+    upload.close()
+    return result
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Потоковая загрузка картинок; отказы копит в request.upload_errors."""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        self.oversized = content_length > (
+            settings.UPLOAD_MAX_SIZE + settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        )
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+        self.header = bytearray()
+        self.checked = False
+        if self.oversized:
+            self.skip(self.too_large())
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_SIZE:
+            self.skip(self.too_large())
+        if not self.checked:
+            self.header += raw_data
+            self.check_header()
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        # Исключение отсюда парсер не перехватывает: файл просто не
+        # попадает в request.FILES.
+        if not self.checked:
+            return self.reject('Загрузите картинку: файл повреждён.')
+        upload = super().file_complete(file_size)
+        try:
+            return reencode(upload)
+        except (OSError, SyntaxError, ValueError):
+            return self.reject('Не удалось прочитать картинку.')
+
+    def check_header(self):
+        header = read_header(bytes(self.header))
+        if header is None:
+            if len(self.header) >= HEADER_LIMIT:
+                self.skip(UNSUPPORTED)
+            return
+        image_format, (width, height) = header
+        if image_format not in FORMATS:
+            self.skip(UNSUPPORTED)
+        if width * height > settings.UPLOAD_MAX_PIXELS:
+            self.skip(
+                f'Картинка {width}×{height} слишком велика: допустимо до '
+                f'{settings.UPLOAD_MAX_PIXELS // 10 ** 6} млн точек.'
+            )
+        self.checked = True
+        self.header = None
+
+    def too_large(self):
+        return (
+            'Файл слишком большой: допустимо до '
+            f'{filesizeformat(settings.UPLOAD_MAX_SIZE)}.'
+        )
+
+    def reject(self, message):
+        self.file.close()
+        self.request.upload_errors[self.field_name] = message
+
+    def skip(self, message):
+        """Отказ посреди файла: остаток части парсер пропустит."""
+        self.reject(message)
+        raise SkipFile(message)
+
+
+def image_uploads(view):
+    """Принимает файлы запроса через ImageUploadHandler.
+
+    Обработчики нельзя сменить после чтения тела, а CsrfViewMiddleware
+    читает его раньше представления, поэтому CSRF проверяется здесь.
+    """
+    protected = csrf_protect(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_errors = {}
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return csrf_exempt(wrapper)
@@ -8,8 +8,14 @@ app_name = "posts"
 urlpatterns = [
     path('', views.index, name="index"),
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
+    path('search/', views.post_search, name='post_search'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path('create/', views.post_create, name='post_create'),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path(
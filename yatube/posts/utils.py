@@ -1,12 +1,194 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Sequence
+
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .caching import attach_card_versions
+from .models import Comment
 
 POST_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+CURSOR_PARAM = 'cursor'
+NEXT = 'n'
+PREVIOUS = 'p'
+PAGES_ON_EACH_SIDE = 2
+PAGES_ON_ENDS = 1
+
+
+def encode_cursor(obj, direction):
+    if isinstance(obj, dict):
+        pub_date, pk = obj['pub_date'], obj['pk']
+    else:
+        pub_date, pk = obj.pub_date, obj.pk
+    value = f'{direction}|{pub_date.isoformat()}|{pk}'
+    return urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        value = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, pub_date, pk = value.decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class KeysetPage(Sequence):
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Keyset page of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return encode_cursor(self.object_list[-1], NEXT)
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            return encode_cursor(self.object_list[0], PREVIOUS)
 
 
-def get_paginator_helper(request, post_list):
-    paginator = Paginator(
+class KeysetPaginator:
+    """Постраничный вывод по ключу (pub_date, pk) без COUNT и OFFSET."""
+
+    def __init__(self, object_list, per_page, descending=True):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.descending = descending
+
+    def _ordering(self, backwards):
+        prefix = '-' if self.descending != backwards else ''
+        return f'{prefix}pub_date', f'{prefix}pk'
+
+    def _after(self, pub_date, pk, backwards):
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        return (
+            Q(**{f'pub_date__{lookup}': pub_date})
+            | Q(pub_date=pub_date, **{f'pk__{lookup}': pk})
+        )
+
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+        backwards = position is not None and position[0] == PREVIOUS
+        object_list = self.object_list
+        if position is not None:
+            object_list = object_list.filter(
+                self._after(*position[1:], backwards)
+            )
+        rows = list(
+            object_list.order_by(
+                *self._ordering(backwards)
+            )[:self.per_page + 1]
+        )
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not backwards:
+            return KeysetPage(rows, self, has_more, position is not None)
+        if not rows:
+            return self.get_page()
+        rows.reverse()
+        return KeysetPage(rows, self, True, has_more)
+
+
+class FeedPaginator(Paginator):
+    """Paginator, берущий число объектов из счётчика вместо COUNT(*)."""
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, counter=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+
+    @cached_property
+    def count(self):
+        if self.counter is None:
+            return super().count
+        return self.counter()
+
+    def get_elided_page_range(self, number):
+        last = self.num_pages
+        if last <= (PAGES_ON_EACH_SIDE + PAGES_ON_ENDS) * 2 + 1:
+            return list(self.page_range)
+        window = range(
+            max(number - PAGES_ON_EACH_SIDE, 1),
+            min(number + PAGES_ON_EACH_SIDE, last) + 1,
+        )
+        # Многоточие заменяет не меньше двух страниц: вместо одной
+        # страницы выводится ссылка на неё.
+        pages = list(range(1, PAGES_ON_ENDS + 1))
+        start = window[0]
+        if start > PAGES_ON_ENDS + 2:
+            pages.append(self.ELLIPSIS)
+        else:
+            start = PAGES_ON_ENDS + 1
+        end = window[-1]
+        tail = last - PAGES_ON_ENDS + 1
+        if end < tail - 2:
+            pages.extend(range(start, end + 1))
+            pages.append(self.ELLIPSIS)
+            pages.extend(range(tail, last + 1))
+        else:
+            pages.extend(range(start, last + 1))
+        return pages
+
+    def get_page(self, number):
+        page = super().get_page(number)
+        page.elided_page_range = self.get_elided_page_range(page.number)
+        return page
+
+
+def get_paginator_helper(request, post_list, counter=None, keyset=False):
+    if keyset:
+        paginator = KeysetPaginator(post_list, POST_PER_PAGE)
+        return attach_card_versions(
+            paginator.get_page(request.GET.get(CURSOR_PARAM))
+        )
+    paginator = FeedPaginator(
         post_list,
         POST_PER_PAGE,
+        counter=counter,
     )
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    return attach_card_versions(paginator.get_page(page_number))
+
+
+def comments_of_post(post_id):
+    return Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('text', 'pub_date', 'post_id', 'author__username')
+
+
+def get_comments_page(request, comments):
+    paginator = KeysetPaginator(comments, COMMENTS_PER_PAGE)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
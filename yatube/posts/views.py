@@ -1,26 +1,43 @@
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
 
+from . import counters, search, timeline
+from .caching import attach_card_versions, cache_feed, conditional_feed
 from .forms import PostForm, CommentForm
 from .models import Group, Post, User, Follow
-from .utils import get_paginator_helper
-
-
-@cache_page(20, cache='default', key_prefix='index_page')
+from .uploads import image_uploads
+from .utils import (
+    CURSOR_PARAM,
+    POST_PER_PAGE,
+    comments_of_post,
+    get_comments_page,
+    get_paginator_helper,
+)
+
+
+@conditional_feed('index')
+@cache_feed('index')
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = get_paginator_helper(request, post_list)
+    post_list = Post.objects.for_feed()
+    page_obj = get_paginator_helper(
+        request, post_list, counter=counters.all_posts_count
+    )
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_feed('group:{slug}')
+@cache_feed('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = get_paginator_helper(request, post_list)
+    post_list = group.posts.for_feed()
+    page_obj = get_paginator_helper(
+        request,
+        post_list,
+        counter=lambda: group.posts_count,
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -28,38 +45,92 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_feed('profile:{username}')
+@cache_feed('profile:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = get_paginator_helper(request, post_list)
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    author_profile = counters.profile_of(author)
+    post_list = author.posts.for_feed()
+    page_obj = get_paginator_helper(
+        request,
+        post_list,
+        counter=lambda: author_profile.posts_count,
+    )
     following = request.user.is_authenticated and Follow.objects.filter(
         author=author,
         user=request.user).exists()
     context = {
         "page_obj": page_obj,
         "author": author,
-        "following": following
+        "author_profile": author_profile,
+        "following": following,
+        "count_posts": author_profile.posts_count,
     }
     return render(request, "posts/profile.html", context)
 
 
+@conditional_feed('index')
+@cache_feed('index')
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if search.has_words(query):
+        paginator = search.SearchPaginator(query, POST_PER_PAGE)
+        page_obj = attach_card_versions(
+            paginator.get_page(request.GET.get(CURSOR_PARAM))
+        )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def post_detail_versions(post_id):
+    username = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True
+    ).first()
+    return [f'post:{post_id}', f'profile:{username}']
+
+
+@conditional_feed(post_detail_versions)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), id=post_id
+    )
     form = CommentForm()
-    comments_for_post = post.comments.all()
+    comments_for_post = get_comments_page(
+        request, comments_of_post(post.pk)
+    )
     context = {
         "post": post,
+        "count_posts": counters.profile_of(post.author).posts_count,
         "form": form,
         "comments": comments_for_post
     }
     return render(request, "posts/post_detail.html", context)
 
 
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        "post_id": post_id,
+        "comments": get_comments_page(
+            request, comments_of_post(post_id)
+        ),
+    }
+    return render(request, "posts/includes/comment_list.html", context)
+
+
 @login_required
+@image_uploads
 def post_create(request):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
+        upload_errors=request.upload_errors,
     )
     if form.is_valid():
         post = form.save(commit=False)
@@ -71,6 +142,7 @@ def post_create(request):
 
 
 @login_required
+@image_uploads
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
@@ -78,7 +150,8 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        upload_errors=request.upload_errors,
     )
     if form.is_valid():
         form.save()
@@ -105,10 +178,22 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related("group")
-    page_obj = get_paginator_helper(request, post_list)
+    follows = list(
+        Follow.objects.filter(user=request.user).values_list(
+            "author_id",
+            "author__profile__followers_count",
+            "author__profile__posts_count",
+        )
+    )
+    post_list = timeline.feed(
+        request.user,
+        {author_id: followers for author_id, followers, _ in follows},
+    )
+    page_obj = get_paginator_helper(
+        request,
+        post_list,
+        counter=lambda: sum(posts for _, _, posts in follows),
+    )
     context = {"page_obj": page_obj}
     return render(request, "posts/follow.html", context)
 
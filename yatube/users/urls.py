@@ -2,6 +2,7 @@ from django.contrib.auth.views import LoginView, LogoutView
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -22,7 +23,10 @@ urlpatterns = [
     path('password_change_done',
          auth_views.PasswordChangeDoneView.as_view(),
          name='password_change_done'),
-    path('password_reset_form', auth_views.PasswordResetView.as_view(),
+    path('password_reset_form',
+         auth_views.PasswordResetView.as_view(
+             form_class=QueuedPasswordResetForm
+         ),
          name='password_reset'),
     path('password_reset',
          auth_views.PasswordResetDoneView.as_view(),
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -52,6 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,6 +79,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.cache.cache_timeout',
             ],
         },
     },
@@ -86,12 +91,69 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# sqlite - один файл, годится для разработки и тестов;
+# postgresql - боевой профиль, требует psycopg2. Постоянные соединения
+# живут DB_CONN_MAX_AGE секунд; за PgBouncer в режиме transaction нужно
+# DB_PGBOUNCER=1, чтобы не открывать серверные курсоры.
+
+DATABASE_PROFILES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+    },
+    'postgresql': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('DB_NAME', 'yatube'),
+        'USER': os.getenv('DB_USER', 'yatube'),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', '127.0.0.1'),
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(int(os.getenv('DB_PGBOUNCER', 0))),
+    },
+}
+DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'sqlite')
+DATABASES = {'default': dict(DATABASE_PROFILES[DATABASE_PROFILE])}
+
+# Настройки каждого нового соединения с SQLite (core.signals). В режиме
+# WAL запись комментария не блокирует чтение лент; synchronous=NORMAL в
+# WAL не теряет данных при падении процесса. mmap_size и cache_size
+# (отрицательный - в КиБ) держат горячие страницы базы в памяти,
+# busy_timeout - сколько мс писатель ждёт блокировку. SQLITE_TUNING=0
+# оставляет настройки SQLite по умолчанию; режим WAL хранится в самом
+# файле базы, вернуть его можно через journal_mode=DELETE.
+SQLITE_PRAGMAS = {
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': -int(os.getenv('SQLITE_CACHE_KB', 64 * 1024)),
+    'temp_store': 'MEMORY',
 }
+if not int(os.getenv('SQLITE_TUNING', 1)):
+    SQLITE_PRAGMAS = {}
+
+# Реплики для чтения: DB_REPLICAS - через запятую хосты (postgresql) или
+# файлы (sqlite). Страницы из REPLICA_VIEWS читают с реплики, если автор
+# запроса не писал в базу последние REPLICA_MAX_LAG секунд и данные
+# страницы не менялись за это время; остальное идёт в основную базу.
+DATABASE_REPLICAS = []
+for number, location in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1
+):
+    replica = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    replica['NAME' if DATABASE_PROFILE == 'sqlite' else 'HOST'] = location
+    DATABASES[f'replica{number}'] = replica
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+REPLICA_MAX_LAG = int(os.getenv('REPLICA_MAX_LAG', 5))
 
 
 # Password validation
@@ -132,10 +194,76 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 STATICFILES_DIRS = (os.path.join(BASE_DIR, "static"),)
+STATIC_ROOT = os.getenv("STATIC_ROOT", os.path.join(BASE_DIR, "collected_static"))
+
+# Боевая раздача файлов: collectstatic добавляет хеш к именам и сжатые
+# копии (core.staticfiles), а core.fileserver отдаёт STATIC_URL и
+# MEDIA_URL из wsgi.py в обход Django, с вечным кэшем для файлов с хешем
+# в имени. С FILES_ACCEL_REDIRECT="/protected/" файлы отдаёт nginx:
+# /media/x превращается в X-Accel-Redirect: /protected/media/x, который
+# internal-location nginx отображает на MEDIA_ROOT и STATIC_ROOT.
+SERVE_FILES = bool(int(os.getenv("SERVE_FILES", int(not DEBUG))))
+if SERVE_FILES:
+    STATICFILES_STORAGE = "core.staticfiles.CompressedManifestStorage"
+FILES_ACCEL_REDIRECT = os.getenv("FILES_ACCEL_REDIRECT", "")
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Картинки постов (posts.uploads): больший файл или картинка с большим
+# числом точек отклоняется до декодирования, принятая уменьшается до
+# UPLOAD_MAX_DIMENSION по большей стороне. На декодирование уходит до
+# UPLOAD_MAX_PIXELS * 4 байт памяти.
+UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", 10 * 1024 * 1024))
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", 25 * 10 ** 6))
+UPLOAD_MAX_DIMENSION = int(os.getenv("UPLOAD_MAX_DIMENSION", 2560))
+
+# Загрузки лежат под именами по содержимому (core.storage): одинаковые
+# картинки хранятся одним файлом. Миниатюры sorl сохраняет под своими
+# именами, им нужно обычное хранилище. Файлы без ссылок из записей
+# удаляет manage.py gc_media.
+DEFAULT_FILE_STORAGE = "core.storage.ContentAddressedStorage"
+THUMBNAIL_STORAGE = "django.core.files.storage.FileSystemStorage"
+
+# Фоновые задачи (core.queue): при TASKS_EAGER они выполняются сразу в
+# запросе, иначе их выполняет manage.py run_tasks. Задача, воркер которой
+# не отчитался за TASKS_LOCK_TIMEOUT секунд, возвращается в очередь.
+TASKS_EAGER = bool(int(os.getenv("TASKS_EAGER", int(DEBUG))))
+TASKS_LOCK_TIMEOUT = int(os.getenv("TASKS_LOCK_TIMEOUT", 300))
+
+# Посты авторов, у которых подписчиков больше этого числа, не копируются
+# в ленты подписчиков, а подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = int(os.getenv("TIMELINE_FANOUT_LIMIT", 1000))
+
+# Сколько секунд прокси может отдавать анонимные страницы лент без сверки.
+FEED_CACHE_MAX_AGE = int(os.getenv("FEED_CACHE_MAX_AGE", 60))
+
+# Доля запросов, для которых пишутся Server-Timing и строка в лог
+# core.profiling; сотрудники видят панель с замерами по ?profile.
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0.01))
+PROFILING_SLOWEST_QUERIES = 5
+
+# Каталог файлов метрик воркеров; /metrics складывает их все. Если задан
+# METRICS_TOKEN, /metrics требует заголовок "Authorization: Bearer <токен>".
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(BASE_DIR, "metrics"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.profiling": {
+            "handlers": ["console"],
+            "level": os.getenv("PROFILING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
@@ -144,6 +272,45 @@ LOGIN_REDIRECT_URL = "posts:index"
 
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
-CACHES = {
-    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+# Cache
+# locmem - отдельный кэш в каждом процессе (разработка и тесты);
+# file и sqlite - общий кэш воркеров одного хоста;
+# memcached и redis - общий кэш нескольких хостов, требуют
+# pylibmc и django-redis соответственно.
+
+CACHE_PROFILES = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache"),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "sqlite": {
+        "BACKEND": "core.cache_backends.SQLiteCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+    "memcached": {
+        "BACKEND": "django.core.cache.backends.memcached.PyLibMCCache",
+        "LOCATION": "127.0.0.1:11211",
+    },
+    "redis": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://127.0.0.1:6379/1",
+    },
 }
+CACHE_PROFILE = os.getenv("CACHE_PROFILE", "locmem")
+CACHES = {"default": dict(CACHE_PROFILES[CACHE_PROFILE])}
+if os.getenv("CACHE_LOCATION"):
+    CACHES["default"]["LOCATION"] = os.getenv("CACHE_LOCATION")
+# Сколько живут в кэше страницы лент, карточки постов и их версии.
+# Версии повышаются только в кэше процесса, изменившего данные, поэтому
+# с locmem другие воркеры и команды видят изменения лишь по истечении
+# этого срока: для него он короткий, как был у cache_page.
+PAGE_CACHE_TIMEOUT = int(os.getenv(
+    "PAGE_CACHE_TIMEOUT",
+    20 if CACHE_PROFILE == "locmem" else 60 * 60 * 24,
+))